@@ -0,0 +1,110 @@
+import os
+import time
+import math
+from collections import Counter
+
+from caches import TTLCache
+
+CHAT_RATE = float(os.environ.get("GYEOL_CHAT_RATE_PER_MIN", "20")) / 60
+CHAT_BURST = float(os.environ.get("GYEOL_CHAT_BURST", "5"))
+AGENT_RATE = float(os.environ.get("GYEOL_AGENT_RATE_PER_MIN", "40")) / 60
+AGENT_BURST = float(os.environ.get("GYEOL_AGENT_BURST", "10"))
+# Unauthenticated /api/chat callers, keyed by client address
+CLIENT_RATE = float(os.environ.get("GYEOL_CLIENT_RATE_PER_MIN", "20")) / 60
+CLIENT_BURST = float(os.environ.get("GYEOL_CLIENT_BURST", "5"))
+MAX_GENERATIONS = int(os.environ.get("GYEOL_MAX_GENERATIONS", "32"))
+ADMISSION_KEYS = int(os.environ.get("GYEOL_ADMISSION_KEYS", "50000"))
+
+
+class TokenBuckets:
+    """One token bucket per key; idle keys age out of a bounded LRU."""
+
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        # A bucket idle this long has refilled completely, so forgetting it changes nothing
+        self._buckets = TTLCache(maxsize, burst / rate if rate > 0 else 3600)
+
+    def _level(self, key, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        tokens, updated = bucket
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def wait_time(self, key, now: float) -> float:
+        """Seconds until `key` has a whole token (0 if it has one now)."""
+        level = self._level(key, now)
+        if level >= 1 or self.rate <= 0:
+            return 0.0 if level >= 1 else math.inf
+        return (1 - level) / self.rate
+
+    def take(self, key, now: float):
+        self._buckets.set(key, (self._level(key, now) - 1, now))
+
+
+class AdmissionController:
+    """Per-chat, per-agent and per-client rate limits plus a global cap on concurrent generations.
+
+    Callers get a shed reason back instead of waiting, so an over-budget request costs one canned reply.
+    """
+
+    def __init__(self, max_generations: int):
+        self.max_generations = max_generations
+        self._limits = {
+            "chat": TokenBuckets(CHAT_RATE, CHAT_BURST, ADMISSION_KEYS),
+            "agent": TokenBuckets(AGENT_RATE, AGENT_BURST, ADMISSION_KEYS),
+            "client": TokenBuckets(CLIENT_RATE, CLIENT_BURST, ADMISSION_KEYS),
+        }
+        self.generations = 0
+        self.max_generations_seen = 0
+        self.admitted = 0
+        self.shed: Counter = Counter()
+
+    def admit(self, chat_id=None, agent_id=None, client=None) -> tuple[str | None, float]:
+        """Charge one request to each given key; returns (shed_reason, retry_after) or (None, 0)."""
+        now = time.monotonic()
+        keys = [
+            (name, key) for name, key in (("chat", chat_id), ("agent", agent_id), ("client", client)) if key is not None
+        ]
+        # Only charge the buckets if every one of them has room
+        for name, key in keys:
+            wait = self._limits[name].wait_time(key, now)
+            if wait > 0:
+                self.shed[f"{name}_rate"] += 1
+                return f"{name}_rate", wait
+        for name, key in keys:
+            self._limits[name].take(key, now)
+        self.admitted += 1
+        return None, 0.0
+
+    def try_start_generation(self) -> bool:
+        if self.generations >= self.max_generations:
+            self.shed["overloaded"] += 1
+            return False
+        self.generations += 1
+        self.max_generations_seen = max(self.max_generations_seen, self.generations)
+        return True
+
+    def end_generation(self):
+        self.generations -= 1
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "generations_in_flight": self.generations,
+            "max_generations": self.max_generations,
+            "max_generations_seen": self.max_generations_seen,
+            "limits": {
+                "chat_per_min": round(CHAT_RATE * 60, 2),
+                "chat_burst": CHAT_BURST,
+                "agent_per_min": round(AGENT_RATE * 60, 2),
+                "agent_burst": AGENT_BURST,
+                "client_per_min": round(CLIENT_RATE * 60, 2),
+                "client_burst": CLIENT_BURST,
+            },
+        }
+
+
+admission = AdmissionController(MAX_GENERATIONS)
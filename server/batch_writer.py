@@ -0,0 +1,244 @@
+import os
+import time
+import random
+import asyncio
+import logging
+
+from http_clients import get_client
+
+logger = logging.getLogger("gyeol")
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+WRITE_BEHIND_BATCH = int(os.environ.get("GYEOL_WRITE_BEHIND_BATCH", "200"))
+WRITE_BEHIND_INTERVAL = float(os.environ.get("GYEOL_WRITE_BEHIND_INTERVAL", "0.5"))
+WRITE_BEHIND_MAX_BUFFER = int(os.environ.get("GYEOL_WRITE_BEHIND_MAX_BUFFER", "5000"))
+WRITE_BEHIND_MAX_RETRIES = int(os.environ.get("GYEOL_WRITE_BEHIND_MAX_RETRIES", "5"))
+# A failed row waits base * 2^(attempt-1) seconds (with jitter, capped) before it is sent again
+WRITE_BEHIND_RETRY_BASE = float(os.environ.get("GYEOL_WRITE_BEHIND_RETRY_BASE", "0.5"))
+WRITE_BEHIND_RETRY_MAX = float(os.environ.get("GYEOL_WRITE_BEHIND_RETRY_MAX", "30"))
+
+
+async def _post_rows(table: str, rows: list, prefer: str = "return=minimal", on_conflict: str | None = None) -> int:
+    """Bulk insert rows; returns the HTTP status, or 0 if nothing could be sent."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        return 0
+    headers = {
+        "apikey": SUPABASE_SERVICE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": prefer,
+    }
+    params = {"on_conflict": on_conflict} if on_conflict else {}
+    resp = await get_client("supabase").post(f"{SUPABASE_URL}/rest/v1/{table}", headers=headers, params=params, json=rows)
+    if resp.status_code >= 300:
+        logger.warning(f"[write-behind] {table} bulk insert of {len(rows)} rows failed: {resp.status_code} {resp.text[:200]}")
+    return resp.status_code
+
+
+class _Waiter:
+    __slots__ = ("future", "remaining", "ok")
+
+    def __init__(self, future: asyncio.Future, remaining: int):
+        self.future = future
+        self.remaining = remaining
+        self.ok = True
+
+    def row_done(self, ok: bool):
+        self.ok = self.ok and ok
+        self.remaining -= 1
+        if self.remaining <= 0 and not self.future.done():
+            self.future.set_result(self.ok)
+
+
+def _rejected(status: int) -> bool:
+    # A 4xx means the request itself is bad, usually one row in it; retrying unchanged won't help
+    return 400 <= status < 500 and status not in (408, 429)
+
+
+class BatchWriter:
+    """Buffers rows per table and flushes them as bulk array inserts by size or by time.
+
+    `post(table, rows)` returns the HTTP status. Rows in a rejected (4xx) array are isolated by
+    splitting it, so one bad row doesn't sink the batch; other failures are retried with backoff.
+    """
+
+    def __init__(self, post, max_batch: int, flush_interval: float, max_buffer: int, max_retries: int):
+        self.post = post
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        # table -> list of [row, attempts, waiter, not_before]
+        self._buffers: dict[str, list] = {}
+        self._size = 0
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.retried = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let a flush that is already sending finish; cancelling it would lose the rows it took
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # One last attempt for everything, including rows still backing off
+        await self.flush(force=True)
+        for table, buf in self._buffers.items():
+            if buf:
+                logger.error(f"[write-behind] dropping {len(buf)} unwritten {table} rows at shutdown")
+            for entry in buf:
+                entry[2].row_done(False)
+            self.dropped += len(buf)
+            buf.clear()
+        self._size = 0
+
+    def add(self, table: str, rows: list | dict) -> asyncio.Future:
+        """Buffer rows for a table; the returned future resolves to True once all of them are written."""
+        if isinstance(rows, dict):
+            rows = [rows]
+        future = asyncio.get_running_loop().create_future()
+        if not rows:
+            future.set_result(True)
+            return future
+        waiter = _Waiter(future, len(rows))
+        if self._size + len(rows) > self.max_buffer:
+            logger.error(f"[write-behind] buffer full ({self._size} rows), dropping {len(rows)} {table} rows")
+            self.dropped += len(rows)
+            for _ in rows:
+                waiter.row_done(False)
+            return future
+        buf = self._buffers.setdefault(table, [])
+        buf.extend([row, 0, waiter, 0.0] for row in rows)
+        self._size += len(rows)
+        self.enqueued += len(rows)
+        self.start()
+        if len(buf) >= self.max_batch:
+            self._wakeup.set()
+        return future
+
+    async def write(self, table: str, rows: list | dict, durable: bool = False) -> bool:
+        future = self.add(table, rows)
+        if durable:
+            self._wakeup.set()
+            return await future
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[write-behind] flush error: {e}")
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(WRITE_BEHIND_RETRY_MAX, WRITE_BEHIND_RETRY_BASE * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def flush(self, table: str | None = None, force: bool = False):
+        """Write buffered rows; rows backing off after a failure wait for their turn unless `force`."""
+        async with self._lock:
+            for name in [table] if table else list(self._buffers):
+                buf = self._buffers.get(name)
+                if not buf:
+                    continue
+                now = time.monotonic()
+                ready = [entry for entry in buf if force or entry[3] <= now]
+                # Same list object: rows added while a batch is in flight land in it
+                buf[:] = [entry for entry in buf if not force and entry[3] > now]
+                self._size -= len(ready)
+                while ready:
+                    batch = ready[:self.max_batch]
+                    del ready[:len(batch)]
+                    failed = await self._write_batch(name, batch)
+                    if failed:
+                        retry = []
+                        for entry in failed:
+                            entry[1] += 1
+                            if entry[1] > self.max_retries:
+                                self.dropped += 1
+                                entry[2].row_done(False)
+                            else:
+                                entry[3] = time.monotonic() + self._backoff(entry[1])
+                                retry.append(entry)
+                        self.retried += len(retry)
+                        # Leave the rest for the next tick so a failing upstream isn't hammered
+                        buf[:0] = retry + ready
+                        self._size += len(retry) + len(ready)
+                        break
+
+    async def _send(self, table: str, entries: list) -> list:
+        """Post entries, splitting rejected arrays down to the bad rows; returns entries worth retrying."""
+        try:
+            status = await self.post(table, [entry[0] for entry in entries])
+        except Exception as e:
+            logger.warning(f"[write-behind] {table} bulk insert error: {e}")
+            status = 0
+        self.batches += 1
+        if 200 <= status < 300:
+            self.written += len(entries)
+            for entry in entries:
+                entry[2].row_done(True)
+            return []
+        self.failed_batches += 1
+        if not _rejected(status):
+            return entries
+        if len(entries) == 1:
+            logger.warning(f"[write-behind] {table} row rejected ({status}), dropping it: {str(entries[0][0])[:200]}")
+            self.rejected += 1
+            self.dropped += 1
+            entries[0][2].row_done(False)
+            return []
+        mid = len(entries) // 2
+        return await self._send(table, entries[:mid]) + await self._send(table, entries[mid:])
+
+    async def _write_batch(self, table: str, batch: list) -> list:
+        # PostgREST bulk inserts need every object in the array to share the same keys
+        groups: dict[frozenset, list] = {}
+        for entry in batch:
+            groups.setdefault(frozenset(entry[0]), []).append(entry)
+        failed = []
+        for entries in groups.values():
+            failed.extend(await self._send(table, entries))
+        return failed
+
+    def stats(self) -> dict:
+        return {
+            "buffered": self._size,
+            "buffered_by_table": {name: len(buf) for name, buf in self._buffers.items() if buf},
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+        }
+
+
+write_behind = BatchWriter(
+    _post_rows,
+    max_batch=WRITE_BEHIND_BATCH,
+    flush_interval=WRITE_BEHIND_INTERVAL,
+    max_buffer=WRITE_BEHIND_MAX_BUFFER,
+    max_retries=WRITE_BEHIND_MAX_RETRIES,
+)
@@ -0,0 +1,255 @@
+"""Local stand-ins for PostgREST, Groq, the Telegram Bot API, DuckDuckGo HTML and RSS feeds.
+
+One process serves all of them under path prefixes (/supabase, /groq, /telegram, /ddg, /rss), each
+with its own latency distribution and error rate. /_bench/* exposes call counts and Telegram
+delivery times to the benchmark driver.
+
+    python bench/fakes.py --port 9100 --config '{"groq": {"latency": "lognormal:400:0.4", "error_rate": 0.02}}'
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import hashlib
+from collections import Counter, defaultdict
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_CONFIG = {
+    "supabase": {"latency": "lognormal:15:0.5", "error_rate": 0.0, "error_status": 503},
+    "groq": {"latency": "lognormal:350:0.4", "error_rate": 0.0, "error_status": 503, "stream_chunk_ms": 15},
+    "telegram": {"latency": "lognormal:40:0.3", "error_rate": 0.0, "error_status": 502},
+    "ddg": {"latency": "lognormal:250:0.5", "error_rate": 0.0, "error_status": 503},
+    "rss": {"latency": "lognormal:120:0.4", "error_rate": 0.0, "error_status": 503},
+    "agents": 20,
+}
+
+app = FastAPI(title="GYEOL bench fakes")
+config: dict = {}
+calls: dict[str, Counter] = defaultdict(Counter)
+# chat_id -> wall-clock time of the first message the gateway sent to that chat
+telegram_first_send: dict[str, float] = {}
+_post_ids = iter(range(1, 10**9))
+
+
+def _sample_ms(spec: str) -> float:
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return random.lognormvariate(0, sigma) * median
+    raise ValueError(f"unknown latency distribution {spec!r}")
+
+
+async def _upstream(service: str, route: str) -> Response | None:
+    """Count the call, sleep for the sampled latency and maybe return an injected error."""
+    calls[service][route] += 1
+    cfg = config[service]
+    await asyncio.sleep(_sample_ms(cfg["latency"]) / 1000)
+    if random.random() < cfg.get("error_rate", 0.0):
+        calls[service]["_errors"] += 1
+        return JSONResponse({"message": "injected error"}, status_code=cfg.get("error_status", 503))
+    return None
+
+
+# --- PostgREST ---
+
+def _agent_id(i: int) -> str:
+    return f"00000000-0000-4000-8000-{i:012d}"
+
+
+def _post_id(i: int) -> str:
+    return f"00000000-0000-4000-9000-{i:012d}"
+
+
+def _rows(table: str, limit: int) -> list:
+    now = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+    if table == "gyeol_agents":
+        return [{
+            "id": _agent_id(i), "name": f"bench-{i}", "gen": 1, "warmth": 60, "logic": 55, "creativity": 50,
+            "energy": 50, "humor": 45, "intimacy": 10, "mood": "happy", "total_conversations": 42,
+            "consecutive_days": 3, "evolution_progress": 10, "last_active": now, "settings": {},
+        } for i in range(min(limit, config["agents"]))]
+    if table == "gyeol_telegram_links":
+        return [{"agent_id": _agent_id(0), "user_id": "bench"}]
+    if table == "gyeol_conversations":
+        return [{
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"벤치마크 대화 메시지 {i}번, 오늘 하루는 어땠는지 이야기해 볼까?",
+            "created_at": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00",
+        } for i in range(limit)]
+    if table == "gyeol_user_memories":
+        return [{"id": f"m{i}", "category": "preference", "key": f"key_{i}", "value": f"값 {i}", "confidence": 80} for i in range(limit)]
+    if table == "gyeol_learned_topics":
+        return [{"id": i, "title": f"주제 {i}", "summary": f"요약 {i}"} for i in range(limit)]
+    if table == "gyeol_conversation_insights":
+        return [{"next_hint": "요즘 일이 바쁜 것 같아", "what_to_improve": "더 짧게"}][:limit]
+    if table == "gyeol_moltbook_posts":
+        return [{
+            "id": _post_id(i), "agent_id": _agent_id(i % config["agents"]), "content": f"벤치마크 게시물 {i}",
+            "post_type": "thought", "likes": i % 7, "comments_count": i % 3, "created_at": now,
+        } for i in range(limit)]
+    return []
+
+
+@app.api_route("/supabase/rest/v1/{table}", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+async def postgrest(table: str, request: Request):
+    error = await _upstream("supabase", f"{request.method} {table}")
+    if error:
+        return error
+    prefer = request.headers.get("prefer", "")
+    if request.method == "HEAD" or "count=" in prefer:
+        return Response(status_code=200 if request.method == "HEAD" else 206, headers={"Content-Range": "0-0/42"})
+    if request.method == "GET":
+        limit = int(request.query_params.get("limit", "10"))
+        return JSONResponse(_rows(table, limit))
+    if request.method == "POST":
+        body = json.loads(await request.body() or b"null")
+        if "return=representation" in prefer:
+            rows = body if isinstance(body, list) else [body]
+            now = time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime())
+            return JSONResponse([{"id": f"bench-{next(_post_ids)}", "created_at": now, **row} for row in rows], status_code=201)
+        return Response(status_code=201)
+    return Response(status_code=204)
+
+
+# --- Groq ---
+
+def _completion_text(payload: dict) -> str:
+    system = payload["messages"][0]["content"]
+    user = payload["messages"][-1]["content"]
+    if "search router" in system:
+        return "YES: 오늘 날씨" if "날씨" in user else "NO"
+    if "extract user information" in system:
+        return '[{"category":"interest","key":"bench_topic","value":"벤치마크","confidence":80}]'
+    if "Analyze this conversation" in system:
+        return json.dumps({
+            "topics": ["일상"], "emotion_arc": "positive", "underlying_need": "대화", "what_worked": "공감",
+            "what_to_improve": "간결함", "personality_delta": {"warmth": 1}, "next_hint": "안부 묻기",
+        }, ensure_ascii=False)
+    if (payload.get("response_format") or {}).get("type") == "json_object":
+        count = sum(1 for line in user.splitlines() if line[:1].isdigit())
+        return json.dumps({"summaries": [{"i": i, "summary": f"기사 {i} 요약"} for i in range(1, count + 1)]}, ensure_ascii=False)
+    return "안녕! 벤치마크용 응답이에요. 오늘도 좋은 하루 보내고 있어? 궁금한 게 있으면 언제든 물어봐."
+
+
+_RATE_HEADERS = {
+    "x-ratelimit-remaining-requests": "10000",
+    "x-ratelimit-reset-requests": "1m0s",
+    "x-ratelimit-remaining-tokens": "1000000",
+    "x-ratelimit-reset-tokens": "1s",
+}
+
+
+@app.post("/groq/openai/v1/chat/completions")
+async def groq_chat(request: Request):
+    payload = await request.json()
+    error = await _upstream("groq", "stream" if payload.get("stream") else "completion")
+    if error:
+        return error
+    text = _completion_text(payload)
+    if not payload.get("stream"):
+        return JSONResponse({
+            "choices": [{"message": {"role": "assistant", "content": text}}],
+            "usage": {"total_tokens": 100 + len(text)},
+        }, headers=_RATE_HEADERS)
+
+    async def _events():
+        for i in range(0, len(text), 8):
+            await asyncio.sleep(config["groq"].get("stream_chunk_ms", 15) / 1000)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': text[i:i + 8]}}]}, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=_RATE_HEADERS)
+
+
+# --- Telegram Bot API ---
+
+@app.api_route("/telegram/bot{token}/{method}", methods=["GET", "POST"])
+async def telegram(token: str, method: str, request: Request):
+    error = await _upstream("telegram", method)
+    if error:
+        return error
+    payload = json.loads(await request.body() or b"{}")
+    chat_id = str(payload.get("chat_id", ""))
+    if method == "sendMessage" and chat_id and chat_id not in telegram_first_send:
+        telegram_first_send[chat_id] = time.time()
+    return {"ok": True, "result": {"message_id": random.randint(1, 10**6), "chat": {"id": chat_id}}}
+
+
+# --- DuckDuckGo HTML ---
+
+@app.post("/ddg/html/")
+async def ddg(request: Request):
+    error = await _upstream("ddg", "search")
+    if error:
+        return error
+    results = "".join(
+        f'<a class="result__a" href="https://example.com/{i}">결과 {i}</a>'
+        f'<a class="result__url" href="https://example.com/{i}">example.com</a>'
+        f'<a class="result__snippet">벤치마크 검색 결과 {i} 요약 문장입니다.</a>'
+        for i in range(5)
+    )
+    return Response(f"<html><body>{results}</body></html>", media_type="text/html")
+
+
+# --- RSS ---
+
+@app.get("/rss/{feed}")
+async def rss(feed: str, request: Request):
+    error = await _upstream("rss", feed)
+    if error:
+        return error
+    # New items every minute, so conditional GETs see both 304s and fresh content
+    minute = int(time.time() // 60)
+    etag = '"' + hashlib.sha1(f"{feed}:{minute}".encode()).hexdigest()[:16] + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    items = "".join(
+        f"<item><title>{feed} 기사 {minute}-{i}</title><link>https://example.com/{feed}/{minute}/{i}</link>"
+        f"<guid>{feed}-{minute}-{i}</guid></item>"
+        for i in range(10)
+    )
+    return Response(f"<rss><channel><title>{feed}</title>{items}</channel></rss>", media_type="application/rss+xml", headers={"ETag": etag})
+
+
+# --- driver hooks ---
+
+@app.get("/_bench/stats")
+async def bench_stats():
+    return {service: dict(counter) for service, counter in calls.items()}
+
+
+@app.get("/_bench/telegram")
+async def bench_telegram():
+    return telegram_first_send
+
+
+@app.post("/_bench/reset")
+async def bench_reset():
+    calls.clear()
+    telegram_first_send.clear()
+    return {"ok": True}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--config", default="{}", help="JSON overrides for DEFAULT_CONFIG, per service")
+    args = parser.parse_args(argv)
+    overrides = json.loads(args.config)
+    for key, value in DEFAULT_CONFIG.items():
+        config[key] = {**value, **overrides.get(key, {})} if isinstance(value, dict) else overrides.get(key, value)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Offline gateway benchmark.
+
+Starts bench/fakes.py and the gateway (uvicorn main:app) as subprocesses, with every upstream
+pointed at the fakes. It then drives each scenario open-loop at a target request rate and prints
+a JSON report to compare between runs:
+
+    cd server && python bench/run.py --duration 20 --rate 20 --out before.json
+    python bench/run.py --scenarios telegram --rate telegram=50 --fakes '{"groq": {"error_rate": 0.05}}'
+
+Scenarios: chat (/api/chat), telegram (/webhook/telegram; `e2e_ms` is webhook -> first
+sendMessage), social (feed/post/like/comment mix) and heartbeat (/openclaw/heartbeat, which starts
+run_heartbeat_cycle in the background; upstream calls are counted after a drain).
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import subprocess
+from collections import Counter
+
+import httpx
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("chat", "telegram", "social", "heartbeat")
+DEFAULT_RATES = {"chat": 20.0, "telegram": 20.0, "social": 50.0, "heartbeat": 0.5}
+
+CHAT_MESSAGES = [
+    "안녕! 오늘 기분 어때?",
+    "요즘 너무 피곤해",
+    "오늘 서울 날씨 알려줘",
+    "최근 AI 뉴스 뭐 있어?",
+    "주말에 뭐 하면 좋을까?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: list, q: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+def _latency_summary(values: list) -> dict:
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+        "mean": round(sum(values) / len(values), 2) if values else None,
+    }
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} exited with {proc.returncode} before becoming ready")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _gateway_env(fakes_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": f"{fakes_url}/supabase",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "GROQ_API_KEY": "bench",
+        "GROQ_BASE_URL": f"{fakes_url}/groq/openai/v1",
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_API_URL": f"{fakes_url}/telegram",
+        "GYEOL_DDG_URL": f"{fakes_url}/ddg/html/",
+        "OPENCLAW_RSS_FEEDS": f"Tech|{fakes_url}/rss/tech,News|{fakes_url}/rss/news",
+        "KOYEB_PUBLIC_URL": "http://127.0.0.1",
+        "OPENCLAW_HEARTBEAT_ENABLED": "0",
+        # One gateway process, so it is always the heartbeat leader
+        "OPENCLAW_LEADER_BACKEND": "off",
+        "GYEOL_AGENT_ID": "",
+        # Every bench chat comes from one address and maps to one fake agent; keep admission control out of the measurement
+        "GYEOL_AGENT_RATE_PER_MIN": "1000000",
+        "GYEOL_AGENT_BURST": "1000000",
+        "GYEOL_CLIENT_RATE_PER_MIN": "1000000",
+        "GYEOL_CLIENT_BURST": "1000000",
+        # Fresh state per run: no persisted LLM cache or seen-index between runs
+        "GYEOL_LLM_CACHE_PATH": "",
+        "OPENCLAW_SEEN_INDEX_PATH": "",
+    })
+    return env
+
+
+class Scenario:
+    def __init__(self, name: str, client: httpx.AsyncClient, gateway_url: str):
+        self.name = name
+        self.client = client
+        self.url = gateway_url
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+        # chat_id -> wall-clock send time, for Telegram end-to-end latency
+        self.sent_at: dict[str, float] = {}
+
+    async def fire(self, n: int):
+        started = time.perf_counter()
+        try:
+            resp = await self._request(n)
+            self.statuses[resp.status_code] += 1
+        except httpx.HTTPError as e:
+            self.statuses[type(e).__name__] += 1
+            return
+        self.latencies.append((time.perf_counter() - started) * 1000)
+
+    async def _request(self, n: int) -> httpx.Response:
+        if self.name == "chat":
+            return await self.client.post(f"{self.url}/api/chat", json={
+                "message": random.choice(CHAT_MESSAGES), "agentId": "bench",
+            })
+        if self.name == "telegram":
+            chat_id = str(7_000_000 + n)
+            self.sent_at[chat_id] = time.time()
+            return await self.client.post(f"{self.url}/webhook/telegram", json={
+                "update_id": 900_000_000 + n,
+                "message": {"chat": {"id": int(chat_id)}, "text": random.choice(CHAT_MESSAGES)},
+            })
+        if self.name == "social":
+            # The same ids the fake PostgREST serves for posts and agents
+            post_id = f"00000000-0000-4000-9000-{n % 50:012d}"
+            agent_id = f"00000000-0000-4000-8000-{n % 20:012d}"
+            roll = random.random()
+            if roll < 0.7:
+                return await self.client.get(f"{self.url}/api/social/feed", params={"limit": "20"})
+            if roll < 0.9:
+                return await self.client.post(f"{self.url}/api/social/like", json={"postId": post_id, "agentId": agent_id})
+            if roll < 0.95:
+                return await self.client.post(f"{self.url}/api/social/post", json={"agentId": agent_id, "content": f"벤치 게시물 {n}"})
+            return await self.client.post(f"{self.url}/api/social/comment", json={
+                "postId": post_id, "agentId": agent_id, "content": f"벤치 댓글 {n}",
+            })
+        return await self.client.post(f"{self.url}/openclaw/heartbeat")
+
+
+async def _run_scenario(name: str, rate: float, duration: float, gateway_url: str, fakes_url: str, drain: float) -> dict:
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        await client.post(f"{fakes_url}/_bench/reset")
+        scenario = Scenario(name, client, gateway_url)
+        total = max(1, int(rate * duration))
+        started = time.perf_counter()
+        tasks = []
+        # Open loop: requests go out on schedule whether or not earlier ones have finished
+        for n in range(total):
+            delay = started + n / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(scenario.fire(n)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        e2e = []
+        if name == "telegram":
+            # Replies are produced after the webhook acks; give the workers time to finish
+            deadline = time.monotonic() + drain
+            delivered = {}
+            while time.monotonic() < deadline:
+                delivered = (await client.get(f"{fakes_url}/_bench/telegram")).json()
+                if len(delivered) >= len(scenario.sent_at):
+                    break
+                await asyncio.sleep(0.25)
+            e2e = [(delivered[c] - t) * 1000 for c, t in scenario.sent_at.items() if c in delivered]
+        if name == "heartbeat":
+            # The endpoint only starts the cycle; wait for it before counting upstream calls
+            deadline = time.monotonic() + drain
+            while time.monotonic() < deadline:
+                if not (await client.get(f"{gateway_url}/openclaw/status")).json().get("manual_cycle_running"):
+                    break
+                await asyncio.sleep(0.25)
+        upstream = (await client.get(f"{fakes_url}/_bench/stats")).json()
+        gateway_status = (await client.get(f"{gateway_url}/gateway/status")).json()
+
+    ok = sum(count for status, count in scenario.statuses.items() if isinstance(status, int) and status < 400)
+    report = {
+        "requests": total,
+        "ok": ok,
+        "errors": total - ok,
+        "statuses": {str(k): v for k, v in scenario.statuses.items()},
+        "target_rps": rate,
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+        "latency_ms": _latency_summary(scenario.latencies),
+        "upstream_calls": upstream,
+        "upstream_calls_per_request": {
+            service: round(sum(v for k, v in routes.items() if not k.startswith("_")) / total, 2)
+            for service, routes in upstream.items()
+        },
+        "gateway_status": gateway_status,
+    }
+    if name == "telegram":
+        report["e2e_ms"] = _latency_summary(e2e)
+        report["delivered"] = len(e2e)
+    return report
+
+
+def _parse_rates(values: list) -> dict:
+    rates = dict(DEFAULT_RATES)
+    for value in values or []:
+        if "=" in value:
+            name, rate = value.split("=", 1)
+            rates[name] = float(rate)
+        else:
+            rates = {name: float(value) if name != "heartbeat" else rates["heartbeat"] for name in rates}
+    return rates
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _main(args) -> dict:
+    rates = _parse_rates(args.rate)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    for name in scenarios:
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+
+    fakes_port, gateway_port = _free_port(), _free_port()
+    fakes_url = f"http://127.0.0.1:{fakes_port}"
+    gateway_url = f"http://127.0.0.1:{gateway_port}"
+    out = None if args.verbose else subprocess.DEVNULL
+    fakes = subprocess.Popen(
+        [sys.executable, os.path.join(SERVER_DIR, "bench", "fakes.py"), "--port", str(fakes_port), "--config", args.fakes],
+        cwd=SERVER_DIR, stdout=out, stderr=out,
+    )
+    gateway = None
+    try:
+        await _wait_ready(f"{fakes_url}/_bench/stats", fakes)
+        gateway = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(gateway_port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=SERVER_DIR, env=_gateway_env(fakes_url), stdout=out, stderr=out,
+        )
+        await _wait_ready(f"{gateway_url}/healthz", gateway)
+        results = {}
+        for name in scenarios:
+            print(f"[bench] {name}: {rates[name]} rps for {args.duration}s", file=sys.stderr)
+            results[name] = await _run_scenario(name, rates[name], args.duration, gateway_url, fakes_url, args.drain)
+        return {
+            "commit": _git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "duration_s": args.duration,
+            "fakes": json.loads(args.fakes),
+            "scenarios": results,
+        }
+    finally:
+        for proc in (gateway, fakes):
+            if proc is not None and proc.poll() is None:
+                proc.terminate()
+                try:
+                    proc.wait(10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline GYEOL gateway benchmark against local fake upstreams.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--rate", action="append", help="requests/s for every scenario, or name=rps (repeatable)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per scenario")
+    parser.add_argument("--drain", type=float, default=30.0, help="max seconds to wait for queued Telegram replies or a heartbeat cycle")
+    parser.add_argument("--fakes", default="{}", help="JSON latency/error overrides for bench/fakes.py")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show fake and gateway process output")
+    args = parser.parse_args(argv)
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+CONTEXT_CACHE_TTL = float(os.environ.get("GYEOL_CONTEXT_CACHE_TTL", "300"))
+CONTEXT_CACHE_SIZE = int(os.environ.get("GYEOL_CONTEXT_CACHE_SIZE", "4096"))
+LINK_CACHE_TTL = float(os.environ.get("GYEOL_LINK_CACHE_TTL", "3600"))
+LINK_CACHE_NEGATIVE_TTL = float(os.environ.get("GYEOL_LINK_CACHE_NEGATIVE_TTL", "60"))
+LINK_CACHE_SIZE = int(os.environ.get("GYEOL_LINK_CACHE_SIZE", "10000"))
+SEARCH_CACHE_TTL = float(os.environ.get("GYEOL_SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_SIZE = int(os.environ.get("GYEOL_SEARCH_CACHE_SIZE", "1000"))
+SOCIAL_FEED_CACHE_TTL = float(os.environ.get("GYEOL_SOCIAL_FEED_CACHE_TTL", "5"))
+
+# Context sources that change rarely enough to be cached per agent (history is always read fresh)
+CACHED_CONTEXT_SOURCES = ("agent", "memories", "topics", "insight")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        if self._data.pop(key, _MISSING) is not _MISSING:
+            self.invalidations += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller being cancelled must not cancel the shared request
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+agent_context_cache = TTLCache(CONTEXT_CACHE_SIZE, CONTEXT_CACHE_TTL)
+
+
+def get_agent_context(agent_id: str, source: str):
+    return agent_context_cache.get((agent_id, source))
+
+
+def set_agent_context(agent_id: str, source: str, value):
+    agent_context_cache.set((agent_id, source), value)
+
+
+def invalidate_agent_context(agent_id: str, *sources: str):
+    for source in sources or CACHED_CONTEXT_SOURCES:
+        agent_context_cache.pop((agent_id, source))
+
+
+# telegram_chat_id -> agent_id; "" marks a chat known to be unlinked
+telegram_link_cache = TTLCache(LINK_CACHE_SIZE, LINK_CACHE_TTL)
+
+# Recently accepted Telegram update_ids, so re-deliveries are not processed twice
+telegram_update_ids = TTLCache(10000, 600)
+
+# Normalized web search query -> formatted results
+web_search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+web_search_flight = SingleFlight()
+
+# Newest page of the social feed, shared by every polling client; dropped when a post is created
+social_feed_cache = TTLCache(8, SOCIAL_FEED_CACHE_TTL)
+social_feed_flight = SingleFlight()
@@ -0,0 +1,289 @@
+import os
+import re
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+from contextlib import asynccontextmanager
+
+import httpx
+
+from http_clients import get_client
+from prompt_packer import estimate_tokens
+
+logger = logging.getLogger("gyeol")
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1").rstrip("/")
+GROQ_CHAT_URL = f"{GROQ_BASE_URL}/chat/completions"
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+GROQ_MAX_IN_FLIGHT = int(os.environ.get("GYEOL_GROQ_MAX_IN_FLIGHT", "16"))
+# Background work never holds more than this many slots, so a user's request finds one free quickly
+GROQ_BACKGROUND_IN_FLIGHT = int(os.environ.get("OPENCLAW_GROQ_CONCURRENCY", "4"))
+# Share of the rate-limit window background work must leave untouched for interactive calls
+GROQ_RESERVE_REQUESTS = int(os.environ.get("GYEOL_GROQ_RESERVE_REQUESTS", "5"))
+GROQ_RESERVE_TOKENS = int(os.environ.get("GYEOL_GROQ_RESERVE_TOKENS", "3000"))
+GROQ_MAX_QUEUE = int(os.environ.get("GYEOL_GROQ_MAX_QUEUE", "200"))
+GROQ_MAX_WAIT = {
+    INTERACTIVE: float(os.environ.get("GYEOL_GROQ_MAX_WAIT", "10")),
+    BACKGROUND: float(os.environ.get("OPENCLAW_GROQ_MAX_WAIT", "120")),
+}
+GROQ_MAX_RETRIES = {
+    INTERACTIVE: int(os.environ.get("GYEOL_GROQ_RETRIES", "1")),
+    BACKGROUND: int(os.environ.get("OPENCLAW_GROQ_RETRIES", "3")),
+}
+GROQ_BACKOFF_BASE = float(os.environ.get("GYEOL_GROQ_BACKOFF_BASE", "0.5"))
+GROQ_BACKOFF_MAX = float(os.environ.get("GYEOL_GROQ_BACKOFF_MAX", "20"))
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class GroqBusy(RuntimeError):
+    pass
+
+
+def _parse_duration(value: str | None) -> float | None:
+    """Parse Groq reset headers like '7.66s', '2m59.56s' or '120ms' into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def _payload_tokens(payload: dict) -> int:
+    prompt = sum(estimate_tokens(m.get("content") or "") for m in payload.get("messages", []))
+    return prompt + int(payload.get("max_tokens") or 0)
+
+
+class _Bucket:
+    """Groq's request/token allowance for the current window, as last reported by x-ratelimit-* headers."""
+
+    __slots__ = ("remaining", "reset_at")
+
+    def __init__(self):
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+
+    def available(self, now: float) -> int | None:
+        if self.remaining is None or now >= self.reset_at:
+            return None
+        return self.remaining
+
+    def update(self, remaining: str | None, reset: str | None, now: float):
+        if remaining is None:
+            return
+        try:
+            self.remaining = int(float(remaining))
+        except ValueError:
+            return
+        self.reset_at = now + (_parse_duration(reset) or 1.0)
+
+    def debit(self, amount: int, now: float):
+        if self.available(now) is not None:
+            self.remaining -= amount
+
+
+class GroqDispatcher:
+    """Priority gate in front of Groq: interactive calls are always granted before background ones,
+    background calls leave a reserve of the rate-limit window, and 429/5xx are retried with jitter."""
+
+    def __init__(self, max_in_flight: int, class_limits: dict, reserve_requests: int, reserve_tokens: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.class_limits = class_limits
+        self.reserve_requests = reserve_requests
+        self.reserve_tokens = reserve_tokens
+        self.max_queue = max_queue
+        self.requests = _Bucket()
+        self.tokens = _Bucket()
+        self.blocked_until = 0.0
+        # heap of (priority, seq, tokens, future)
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._in_flight = {p: 0 for p in PRIORITY_NAMES}
+        self._timer: asyncio.TimerHandle | None = None
+        self._stats = {
+            p: {"granted": 0, "rejected": 0, "retries": 0, "throttled": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for p in PRIORITY_NAMES
+        }
+
+    def _delay(self, priority: int, tokens: int, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        reserve_requests = self.reserve_requests if priority != INTERACTIVE else 0
+        reserve_tokens = self.reserve_tokens if priority != INTERACTIVE else 0
+        requests = self.requests.available(now)
+        if requests is not None and requests - reserve_requests < 1:
+            return self.requests.reset_at - now
+        available_tokens = self.tokens.available(now)
+        if available_tokens is not None and available_tokens - reserve_tokens < tokens:
+            return self.tokens.reset_at - now
+        return 0.0
+
+    def _pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._waiters and sum(self._in_flight.values()) < self.max_in_flight:
+            priority, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            limit = self.class_limits.get(priority)
+            if limit is not None and self._in_flight[priority] >= limit:
+                break
+            delay = self._delay(priority, tokens, now)
+            if delay > 0:
+                self._stats[priority]["throttled"] += 1
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                break
+            heapq.heappop(self._waiters)
+            self._in_flight[priority] += 1
+            self.requests.debit(1, now)
+            self.tokens.debit(tokens, now)
+            future.set_result(None)
+
+    def _release(self, priority: int):
+        self._in_flight[priority] -= 1
+        self._pump()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, tokens: int = 0):
+        stats = self._stats[priority]
+        if len(self._waiters) >= self.max_queue:
+            stats["rejected"] += 1
+            raise GroqBusy(f"Groq queue full ({len(self._waiters)} waiting)")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        self._pump()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), GROQ_MAX_WAIT[priority])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Granted in the same tick we gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release(priority)
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            stats["rejected"] += 1
+            raise GroqBusy(f"waited {GROQ_MAX_WAIT[priority]:.0f}s for a {PRIORITY_NAMES[priority]} Groq slot")
+        wait_ms = (time.monotonic() - started) * 1000
+        stats["granted"] += 1
+        stats["wait_ms_total"] += wait_ms
+        stats["wait_ms_max"] = max(stats["wait_ms_max"], wait_ms)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def observe(self, resp: httpx.Response):
+        now = time.monotonic()
+        headers = resp.headers
+        self.requests.update(headers.get("x-ratelimit-remaining-requests"), headers.get("x-ratelimit-reset-requests"), now)
+        self.tokens.update(headers.get("x-ratelimit-remaining-tokens"), headers.get("x-ratelimit-reset-tokens"), now)
+        if resp.status_code == 429:
+            retry_after = _parse_duration(headers.get("retry-after")) or 1.0
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def _should_retry(self, priority: int, status: int, attempt: int) -> bool:
+        return (status == 429 or status >= 500) and attempt < GROQ_MAX_RETRIES[priority]
+
+    async def _backoff(self, priority: int, attempt: int, reason: str):
+        self._stats[priority]["retries"] += 1
+        # Full jitter keeps a burst of retries from landing on Groq at the same moment
+        delay = random.uniform(0, min(GROQ_BACKOFF_MAX, GROQ_BACKOFF_BASE * 2 ** attempt))
+        logger.warning(f"[groq] {PRIORITY_NAMES[priority]} call got {reason}, retry {attempt + 1} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+    def _headers(self) -> dict:
+        if not GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY not configured")
+        return {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
+
+    async def post(self, priority: int, payload: dict, timeout: float, site: str = "chat") -> httpx.Response:
+        """POST a chat completion through the gate, retrying 429/5xx and connection errors."""
+        headers = self._headers()
+        tokens = _payload_tokens(payload)
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(priority, tokens):
+                    resp = await get_client("groq").post(
+                        GROQ_CHAT_URL, headers=headers, json=payload, timeout=timeout, extensions={"gyeol_site": site},
+                    )
+                    self.observe(resp)
+            except httpx.TransportError as e:
+                if attempt >= GROQ_MAX_RETRIES[priority]:
+                    raise
+                await self._backoff(priority, attempt, type(e).__name__)
+                attempt += 1
+                continue
+            if not self._should_retry(priority, resp.status_code, attempt):
+                return resp
+            await self._backoff(priority, attempt, str(resp.status_code))
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, priority: int, payload: dict, timeout: float, site: str = "chat"):
+        """Open a streaming chat completion; retries only happen before the response is handed out."""
+        headers = self._headers()
+        tokens = _payload_tokens(payload)
+        attempt = 0
+        while True:
+            async with self.slot(priority, tokens):
+                async with get_client("groq").stream(
+                    "POST", GROQ_CHAT_URL, headers=headers, json=payload, timeout=timeout, extensions={"gyeol_site": site},
+                ) as resp:
+                    self.observe(resp)
+                    if not self._should_retry(priority, resp.status_code, attempt):
+                        yield resp
+                        return
+                    await resp.aread()
+            await self._backoff(priority, attempt, str(resp.status_code))
+            attempt += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            s = self._stats[priority]
+            classes[name] = {
+                "queued": sum(1 for w in self._waiters if w[0] == priority and not w[3].done()),
+                "in_flight": self._in_flight[priority],
+                "granted": s["granted"],
+                "rejected": s["rejected"],
+                "retries": s["retries"],
+                "throttled": s["throttled"],
+                "wait_ms_avg": round(s["wait_ms_total"] / s["granted"], 1) if s["granted"] else 0.0,
+                "wait_ms_max": round(s["wait_ms_max"], 1),
+            }
+        return {
+            "classes": classes,
+            "remaining_requests": self.requests.available(now),
+            "remaining_tokens": self.tokens.available(now),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+        }
+
+
+groq_dispatcher = GroqDispatcher(
+    GROQ_MAX_IN_FLIGHT,
+    class_limits={BACKGROUND: GROQ_BACKGROUND_IN_FLIGHT},
+    reserve_requests=GROQ_RESERVE_REQUESTS,
+    reserve_tokens=GROQ_RESERVE_TOKENS,
+    max_queue=GROQ_MAX_QUEUE,
+)
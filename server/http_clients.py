@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+
+import httpx
+
+from metrics import upstream_seconds, upstream_errors
+
+logger = logging.getLogger("gyeol")
+
+HTTP2_ENABLED = os.environ.get("GYEOL_HTTP2", "0") == "1"
+HTTP_MAX_CONNECTIONS = int(os.environ.get("GYEOL_HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("GYEOL_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("GYEOL_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("GYEOL_HTTP_CONNECT_TIMEOUT", "5"))
+
+# One keep-alive pool per upstream; default read timeout per upstream (seconds)
+UPSTREAMS = {
+    "supabase": {"timeout": float(os.environ.get("GYEOL_SUPABASE_TIMEOUT", "10")), "follow_redirects": False},
+    "groq": {"timeout": float(os.environ.get("GYEOL_GROQ_TIMEOUT", "30")), "follow_redirects": False},
+    "telegram": {"timeout": float(os.environ.get("GYEOL_TELEGRAM_TIMEOUT", "10")), "follow_redirects": False},
+    "duckduckgo": {"timeout": float(os.environ.get("GYEOL_DDG_TIMEOUT", "10")), "follow_redirects": True},
+    "rss": {"timeout": float(os.environ.get("GYEOL_RSS_TIMEOUT", "10")), "follow_redirects": True},
+}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_http2: bool | None = None
+
+
+def _http2_available() -> bool:
+    global _http2
+    if _http2 is None:
+        _http2 = HTTP2_ENABLED
+        if _http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("GYEOL_HTTP2=1 but the 'h2' package is not installed, using HTTP/1.1")
+                _http2 = False
+    return _http2
+
+
+def _metrics_target(upstream: str, request: httpx.Request) -> str:
+    # Low-cardinality label per request; never the raw URL (Telegram paths carry the bot token)
+    if upstream == "supabase":
+        path = request.url.path
+        return path.split("/rest/v1/", 1)[-1].split("/", 1)[0] if "/rest/v1/" in path else path
+    if upstream == "groq":
+        return request.extensions.get("gyeol_site", "unknown")
+    if upstream == "telegram":
+        return request.url.path.rsplit("/", 1)[-1]
+    if upstream == "rss":
+        return request.url.host
+    return "search"
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Records per-upstream latency (until response headers) and failures for /metrics."""
+
+    def __init__(self, upstream: str, transport: httpx.AsyncBaseTransport):
+        self.upstream = upstream
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        target = _metrics_target(self.upstream, request)
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception as e:
+            upstream_errors.inc(upstream=self.upstream, target=target, kind=type(e).__name__)
+            raise
+        finally:
+            upstream_seconds.observe(time.perf_counter() - started, upstream=self.upstream, target=target)
+        if response.status_code >= 400:
+            upstream_errors.inc(upstream=self.upstream, target=target, kind=f"{response.status_code // 100}xx")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    cfg = UPSTREAMS[name]
+    transport = httpx.AsyncHTTPTransport(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return httpx.AsyncClient(
+        transport=InstrumentedTransport(name, transport),
+        timeout=httpx.Timeout(cfg["timeout"], connect=HTTP_CONNECT_TIMEOUT),
+        follow_redirects=cfg["follow_redirects"],
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it lazily outside of lifespan."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        _clients[name] = client
+    return client
+
+
+async def start_clients():
+    for name in UPSTREAMS:
+        get_client(name)
+    logger.info(f"HTTP client pools ready: {', '.join(UPSTREAMS)} (http2={_http2_available()})")
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"HTTP client close error: {e}")
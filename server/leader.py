@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import fcntl
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from http_clients import get_client
+
+logger = logging.getLogger("openclaw")
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "")
+SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY", "")
+# auto: Supabase lease row when Supabase is configured, else a file lock (one host); off: every process leads
+LEADER_BACKEND = os.environ.get("OPENCLAW_LEADER_BACKEND", "auto")
+LEASE_TTL = int(os.environ.get("OPENCLAW_LEASE_TTL", "60"))
+LEASE_FILE = os.environ.get("OPENCLAW_LEASE_FILE", "/tmp/openclaw_heartbeat.lock")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Lease:
+    """Leader election over a TTL lease, renewed every ttl/3.
+
+    The holder publishes `state_fn()` with each renewal and everyone else reads it back, so any
+    process can report what the leader is doing. Leadership is dropped locally once the lease
+    would have expired without a successful renewal, before anyone else can take it over.
+    """
+
+    def __init__(self, name: str, ttl: int, backend: str = LEADER_BACKEND, lock_path: str = LEASE_FILE):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend
+        self.lock_path = lock_path
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.state_fn = None
+        self.leader: str | None = None
+        self.leader_since: str | None = None
+        self.leader_state: dict = {}
+        self.transitions = 0
+        self.renew_errors = 0
+        self._held_until = 0.0
+        self._lock_file = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.backend == "off" or self._held_until > time.monotonic()
+
+    def _state(self) -> dict:
+        state = self.state_fn() if self.state_fn else {}
+        return {**state, "published_at": _now_iso()}
+
+    async def _rpc(self, fn: str, body: dict):
+        headers = {
+            "apikey": SUPABASE_SERVICE_KEY,
+            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+            "Content-Type": "application/json",
+        }
+        resp = await get_client("supabase").post(f"{SUPABASE_URL}/rest/v1/rpc/{fn}", headers=headers, json=body)
+        if resp.status_code >= 300:
+            raise RuntimeError(f"{fn} failed: {resp.status_code} {resp.text[:200]}")
+        return resp.json() if resp.content else None
+
+    async def _renew_supabase(self) -> float:
+        sent_at = time.monotonic()
+        rows = await self._rpc("openclaw_acquire_lease", {
+            "p_name": self.name,
+            "p_holder": self.holder_id,
+            "p_ttl_seconds": self.ttl,
+            # Only written if this call takes or keeps the lease
+            "p_state": self._state(),
+        })
+        row = rows[0] if isinstance(rows, list) and rows else (rows or {})
+        self.leader = row.get("holder")
+        self.leader_since = row.get("acquired_at")
+        self.leader_state = row.get("state") or {}
+        # The database set expires_at from its own clock after we sent the request, so this is conservative
+        return sent_at + self.ttl if self.leader == self.holder_id else 0.0
+
+    def _renew_file(self) -> float:
+        if self._lock_file is None:
+            lock_file = open(self.lock_path, "a+")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._lock_file = lock_file
+                self.leader_since = _now_iso()
+            except BlockingIOError:
+                lock_file.close()
+        state_path = f"{self.lock_path}.json"
+        if self._lock_file is not None:
+            self.leader = self.holder_id
+            self.leader_state = self._state()
+            tmp_path = f"{state_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"holder": self.holder_id, "acquired_at": self.leader_since, "state": self.leader_state}, f)
+            os.replace(tmp_path, state_path)
+            # The OS drops the lock with the process, so holding it never expires on its own
+            return float("inf")
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                shared = json.load(f)
+            self.leader = shared.get("holder")
+            self.leader_since = shared.get("acquired_at")
+            self.leader_state = shared.get("state") or {}
+        except (OSError, ValueError):
+            self.leader, self.leader_state = None, {}
+        return 0.0
+
+    async def renew(self):
+        was_leader = self.is_leader
+        try:
+            if self.backend == "supabase":
+                self._held_until = await self._renew_supabase()
+            else:
+                self._held_until = await asyncio.to_thread(self._renew_file)
+        except Exception as e:
+            # Keep whatever time is left on the lease; is_leader lapses on its own if renewals keep failing
+            self.renew_errors += 1
+            logger.warning(f"[leader] {self.name} renewal failed: {e}")
+        if self.is_leader != was_leader:
+            self.transitions += 1
+            logger.info(f"[leader] {self.holder_id} {'acquired' if self.is_leader else 'lost'} {self.name} (leader={self.leader})")
+
+    async def _loop(self):
+        while True:
+            await self.renew()
+            await asyncio.sleep(max(1.0, self.ttl / 3))
+
+    def start(self, state_fn=None):
+        self.state_fn = state_fn
+        if self.backend == "auto":
+            self.backend = "supabase" if SUPABASE_URL and SUPABASE_SERVICE_KEY else "file"
+        if self.backend == "off":
+            self.leader = self.holder_id
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"[leader] Electing {self.name} via {self.backend} as {self.holder_id} (ttl={self.ttl}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        held = self._held_until > time.monotonic()
+        self._held_until = 0.0
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        elif held and self.backend == "supabase":
+            try:
+                await self._rpc("openclaw_release_lease", {"p_name": self.name, "p_holder": self.holder_id})
+            except Exception as e:
+                logger.warning(f"[leader] {self.name} release failed: {e}")
+
+    def status(self) -> dict:
+        return {
+            "backend": self.backend,
+            "lease": self.name,
+            "ttl": self.ttl,
+            "holder_id": self.holder_id,
+            "is_leader": self.is_leader,
+            "leader": self.leader,
+            "leader_since": self.leader_since,
+            "leader_state": self.leader_state,
+            "transitions": self.transitions,
+            "renew_errors": self.renew_errors,
+        }
+
+
+heartbeat_lease = Lease("openclaw-heartbeat", LEASE_TTL)
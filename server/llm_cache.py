@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+
+from caches import TTLCache
+
+logger = logging.getLogger("gyeol")
+
+# Empty path keeps the cache in memory only
+LLM_CACHE_PATH = os.environ.get("GYEOL_LLM_CACHE_PATH", "/tmp/gyeol_llm_cache.sqlite3")
+LLM_CACHE_MEMORY_SIZE = int(os.environ.get("GYEOL_LLM_CACHE_MEMORY_SIZE", "2000"))
+LLM_CACHE_MAX_ROWS = int(os.environ.get("GYEOL_LLM_CACHE_MAX_ROWS", "50000"))
+LLM_CACHE_DEFAULT_TTL = float(os.environ.get("GYEOL_LLM_CACHE_TTL", "604800"))
+# Expired/excess rows are swept every this many writes
+LLM_CACHE_SWEEP_EVERY = 200
+
+
+def cache_key(*parts) -> str:
+    """Content address for an LLM call: the same model, messages and parameters hash the same."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class LLMCache:
+    """LRU front over a SQLite table of LLM responses, each with its own TTL and token cost."""
+
+    def __init__(self, path: str, memory_size: int, max_rows: int):
+        self.path = path
+        self.max_rows = max_rows
+        # key -> (value, tokens); the front entry never outlives the row's own expiry
+        self._front = TTLCache(memory_size, LLM_CACHE_DEFAULT_TTL)
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._db_failed = False
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.stores = 0
+        self.swept = 0
+
+    def _conn(self) -> sqlite3.Connection | None:
+        if self._db is None and self.path and not self._db_failed:
+            try:
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+                db.commit()
+                self._db = db
+            except sqlite3.Error as e:
+                logger.warning(f"[llm-cache] SQLite store unavailable at {self.path}, memory only: {e}")
+                self._db_failed = True
+        return self._db
+
+    def _db_get(self, key: str):
+        with self._db_lock:
+            db = self._conn()
+            if db is None:
+                return None
+            now = time.time()
+            row = db.execute("SELECT value, tokens, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[2] < now:
+                db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                db.commit()
+                return None
+            db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            return row
+
+    def _db_set(self, key: str, value: str, tokens: int, expires_at: float):
+        with self._db_lock:
+            db = self._conn()
+            if db is None:
+                return
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, tokens, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, tokens, expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % LLM_CACHE_SWEEP_EVERY == 0:
+                swept = db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,)).rowcount
+                # Size cap: drop the least recently used rows beyond max_rows
+                swept += db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                ).rowcount
+                self.swept += swept
+            db.commit()
+
+    async def get(self, key: str) -> str | None:
+        entry = self._front.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+            self.tokens_saved += entry[1]
+            return entry[0]
+        try:
+            row = await asyncio.to_thread(self._db_get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"[llm-cache] read error: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        value, tokens, expires_at = row
+        self._front.set(key, (value, tokens), ttl=max(0.0, expires_at - time.time()))
+        self.disk_hits += 1
+        self.tokens_saved += tokens
+        return value
+
+    async def set(self, key: str, value: str, tokens: int = 0, ttl: float | None = None):
+        ttl = LLM_CACHE_DEFAULT_TTL if ttl is None else ttl
+        self._front.set(key, (value, tokens), ttl=ttl)
+        self.stores += 1
+        try:
+            await asyncio.to_thread(self._db_set, key, value, tokens, time.time() + ttl)
+        except sqlite3.Error as e:
+            logger.warning(f"[llm-cache] write error: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "path": self.path if self._db is not None else None,
+            "memory_size": len(self._front),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "stores": self.stores,
+            "swept": self.swept,
+        }
+
+
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_MAX_ROWS)
@@ -1,11 +1,40 @@
 import os
+import re
+import json
+import time
+import math
+import uuid
+import base64
+import asyncio
+import hashlib
+import hmac
 import logging
-import httpx
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from functools import lru_cache
+from urllib.parse import unquote
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from http_clients import get_client, start_clients, close_clients
+from caches import (
+    TTLCache, CACHED_CONTEXT_SOURCES, LINK_CACHE_NEGATIVE_TTL, agent_context_cache, telegram_link_cache,
+    telegram_update_ids, web_search_cache, web_search_flight, social_feed_cache, social_feed_flight,
+    get_agent_context, set_agent_context, invalidate_agent_context,
+)
+from work_queue import KeyedWorkQueue
+from batch_writer import write_behind
+from social_counters import social_counters, like_writer
+from admission import admission
+from search_router import route_search, get_routing_stats
+from prompt_packer import section, pack_prompt
+from groq_dispatcher import groq_dispatcher, INTERACTIVE
+from llm_cache import llm_cache, cache_key
+import metrics
+from metrics import telegram_stage_seconds, register_collector
+
 logger = logging.getLogger("gyeol")
 
 KOYEB_URL = os.environ.get("KOYEB_PUBLIC_URL", "https://gyeol-openclaw-gyeol-dab5f459.koyeb.app")
@@ -22,10 +51,9 @@ async def _supabase_get(path: str, params: dict | None = None) -> dict | list |
         "Accept": "application/json",
     }
     url = f"{SUPABASE_URL}/rest/v1/{path}"
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        resp = await client.get(url, headers=headers, params=params or {})
-        if resp.status_code == 200:
-            return resp.json()
+    resp = await get_client("supabase").get(url, headers=headers, params=params or {})
+    if resp.status_code == 200:
+        return resp.json()
     return None
 
 
@@ -39,9 +67,25 @@ async def _supabase_post(path: str, body: list | dict) -> dict | list | None:
         "Prefer": "return=minimal",
     }
     url = f"{SUPABASE_URL}/rest/v1/{path}"
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        resp = await client.post(url, headers=headers, json=body)
-        return {"ok": resp.status_code < 300}
+    resp = await get_client("supabase").post(url, headers=headers, json=body)
+    return {"ok": resp.status_code < 300}
+
+
+async def _supabase_count(path: str, params: dict | None = None) -> int | None:
+    """Row count via a PostgREST HEAD request with count=exact, read from Content-Range."""
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        return None
+    headers = {
+        "apikey": SUPABASE_SERVICE_KEY,
+        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+        "Prefer": "count=exact",
+    }
+    url = f"{SUPABASE_URL}/rest/v1/{path}"
+    resp = await get_client("supabase").head(url, headers=headers, params=params or {})
+    if resp.status_code >= 300:
+        return None
+    total = resp.headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
 
 
 async def _set_telegram_webhook():
@@ -50,21 +94,30 @@ async def _set_telegram_webhook():
         logger.warning("TELEGRAM_BOT_TOKEN not set, skipping webhook registration")
         return
     url = f"{KOYEB_URL}/webhook/telegram"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(
-            f"https://api.telegram.org/bot{token}/setWebhook",
-            json={"url": url, "allowed_updates": ["message"]},
-        )
-        logger.info(f"Telegram webhook set to {url}: {resp.text}")
+    resp = await get_client("telegram").post(
+        f"{TELEGRAM_API_URL}/bot{token}/setWebhook",
+        json={"url": url, "allowed_updates": ["message"]},
+    )
+    logger.info(f"Telegram webhook set to {url}: {resp.text}")
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     from openclaw_runtime import start_heartbeat, stop_heartbeat
+    await start_clients()
     await _set_telegram_webhook()
+    write_behind.start()
+    like_writer.start()
+    telegram_queue.start()
     start_heartbeat()
+    metrics.start_loop_monitor()
     yield
-    stop_heartbeat()
+    await metrics.stop_loop_monitor()
+    await stop_heartbeat()
+    await telegram_queue.stop(TELEGRAM_DRAIN_TIMEOUT)
+    await like_writer.stop()
+    await write_behind.stop()
+    await close_clients()
 
 
 app = FastAPI(title="GYEOL Gateway", lifespan=lifespan)
@@ -79,6 +132,16 @@ app.add_middleware(
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
+# Shared with the web app; /api/chat callers presenting it are trusted to name their agent
+GATEWAY_TOKEN = os.environ.get("OPENCLAW_GATEWAY_TOKEN", "")
+# Reverse proxies in front of the gateway that append to X-Forwarded-For (0: use the socket peer)
+TRUSTED_PROXY_HOPS = int(os.environ.get("GYEOL_TRUSTED_PROXY_HOPS", "0"))
+# Upstream base URLs are overridable so the gateway can run against local stand-ins (see bench/)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+DDG_SEARCH_URL = os.environ.get("GYEOL_DDG_URL", "https://html.duckduckgo.com/html/")
+# Opt-in LLM response caching for repeatable calls; open-ended chat is never cached
+LLM_CACHE_ROUTER_TTL = float(os.environ.get("GYEOL_LLM_CACHE_ROUTER_TTL", "86400"))
+LLM_CACHE_SEARCH_TTL = float(os.environ.get("GYEOL_LLM_CACHE_SEARCH_TTL", "3600"))
 DEFAULT_SYSTEM_PROMPT = """You are GYEOL, a warm and evolving AI companion.
 You speak naturally in Korean like a close friend.
 You never use markdown formatting symbols like * # _ ~ `.
@@ -87,11 +150,13 @@ You remember context from the conversation and grow with the user."""
 
 
 def _build_personality_prompt(p: dict) -> str:
-    warmth = p.get("warmth", 50)
-    logic = p.get("logic", 50)
-    creativity = p.get("creativity", 50)
-    energy = p.get("energy", 50)
-    humor = p.get("humor", 50)
+    return _personality_prompt(
+        p.get("warmth", 50), p.get("logic", 50), p.get("creativity", 50), p.get("energy", 50), p.get("humor", 50),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _personality_prompt(warmth: int, logic: int, creativity: int, energy: int, humor: int) -> str:
     extras = []
     if warmth > 70:
         extras.append("Be extra warm and empathetic.")
@@ -113,41 +178,58 @@ Your personality traits (0-100): warmth={warmth}, logic={logic}, creativity={cre
 You remember context from the conversation and grow with the user."""
 
 
+_DDG_SNIPPET = re.compile(r'class="result__snippet"[^>]*>(.*?)</a>', re.DOTALL)
+_DDG_URL = re.compile(r'class="result__url"[^>]*href="([^"]*)"')
+_DDG_TITLE = re.compile(r'class="result__a"[^>]*>(.*?)</a>', re.DOTALL)
+_DDG_REDIRECT = re.compile(r'uddg=([^&]+)')
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+
+async def _fetch_web_search(query: str, max_results: int) -> str:
+    resp = await get_client("duckduckgo").post(
+        DDG_SEARCH_URL,
+        data={"q": query},
+        headers={"User-Agent": "Mozilla/5.0 (compatible; GyeolBot/1.0)"},
+    )
+    if resp.status_code != 200:
+        return ""
+    html = resp.text
+    # Parse results from HTML
+    results = []
+    snippets = _DDG_SNIPPET.findall(html)
+    urls = _DDG_URL.findall(html)
+    titles = _DDG_TITLE.findall(html)
+    for i in range(min(max_results, len(snippets))):
+        title = _HTML_TAG.sub('', titles[i]).strip() if i < len(titles) else ""
+        snippet = _HTML_TAG.sub('', snippets[i]).strip()
+        url = urls[i] if i < len(urls) else ""
+        if url.startswith("//duckduckgo.com/l/?"):
+            # Extract actual URL from DDG redirect
+            actual = _DDG_REDIRECT.search(url)
+            if actual:
+                url = unquote(actual.group(1))
+        results.append(f"{i+1}. {title}\n   {snippet}\n   출처: {url}")
+    return "\n\n".join(results) if results else ""
+
+
 async def _web_search(query: str, max_results: int = 5) -> str:
-    """Search the web using DuckDuckGo HTML (no API key needed)."""
+    """Search the web using DuckDuckGo HTML (no API key needed).
+
+    Results are cached per normalized query and concurrent identical searches share one request.
+    """
+    key = (" ".join(query.lower().split()), max_results)
+    cached = web_search_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        search_url = "https://html.duckduckgo.com/html/"
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            resp = await client.post(
-                search_url,
-                data={"q": query},
-                headers={"User-Agent": "Mozilla/5.0 (compatible; GyeolBot/1.0)"},
-            )
-        if resp.status_code != 200:
-            return ""
-        html = resp.text
-        # Parse results from HTML
-        results = []
-        import re
-        # Extract result snippets
-        snippets = re.findall(r'class="result__snippet"[^>]*>(.*?)</a>', html, re.DOTALL)
-        urls = re.findall(r'class="result__url"[^>]*href="([^"]*)"', html)
-        titles = re.findall(r'class="result__a"[^>]*>(.*?)</a>', html, re.DOTALL)
-        for i in range(min(max_results, len(snippets))):
-            title = re.sub(r'<[^>]+>', '', titles[i]).strip() if i < len(titles) else ""
-            snippet = re.sub(r'<[^>]+>', '', snippets[i]).strip()
-            url = urls[i] if i < len(urls) else ""
-            if url.startswith("//duckduckgo.com/l/?"):
-                # Extract actual URL from DDG redirect
-                actual = re.search(r'uddg=([^&]+)', url)
-                if actual:
-                    from urllib.parse import unquote
-                    url = unquote(actual.group(1))
-            results.append(f"{i+1}. {title}\n   {snippet}\n   출처: {url}")
-        return "\n\n".join(results) if results else ""
+        results = await web_search_flight.do(key, lambda: _fetch_web_search(query, max_results))
     except Exception as e:
         logger.error(f"Web search error: {e}")
         return ""
+    # Empty results are not cached: they are usually a throttled or failed request
+    if results:
+        web_search_cache.set(key, results)
+    return results
 
 
 @app.get("/health")
@@ -156,29 +238,111 @@ async def health():
     return {"ok": True, "service": "gyeol-gateway", "model": GROQ_MODEL}
 
 
-async def _call_groq(user_message: str, system_prompt: str | None = None, history: list | None = None) -> str:
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY not configured")
+_MARKDOWN_SYMBOLS = str.maketrans("", "", "*#_~`")
+
+
+def _strip_markdown(text: str) -> str:
+    # Symbol-by-symbol removal, so it is safe to apply to individual stream chunks
+    return text.translate(_MARKDOWN_SYMBOLS)
+
+
+def _groq_messages(user_message: str, system_prompt: str | None, history: list | None) -> list:
     messages = [
         {"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT},
     ]
     if history:
         messages.extend(history)
     messages.append({"role": "user", "content": user_message})
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={"model": GROQ_MODEL, "messages": messages, "max_tokens": 1024, "temperature": 0.8},
-        )
+    return messages
+
+
+async def _call_groq(
+    user_message: str, system_prompt: str | None = None, history: list | None = None,
+    cache_ttl: float | None = None, site: str = "chat",
+) -> str:
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY not configured")
+    messages = _groq_messages(user_message, system_prompt, history)
+    payload = {"model": GROQ_MODEL, "messages": messages, "max_tokens": 1024, "temperature": 0.8}
+    key = cache_key(payload) if cache_ttl else None
+    if key:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            return cached
+    resp = await groq_dispatcher.post(INTERACTIVE, payload, timeout=15.0, site=site)
     if resp.status_code != 200:
         raise RuntimeError(f"Groq API error: {resp.status_code} {resp.text}")
     data = resp.json()
-    content = data["choices"][0]["message"]["content"]
-    return content.replace("*", "").replace("#", "").replace("_", "").replace("~", "").replace("`", "")
+    content = _strip_markdown(data["choices"][0]["message"]["content"])
+    if key:
+        await llm_cache.set(key, content, (data.get("usage") or {}).get("total_tokens", 0), cache_ttl)
+    return content
+
+
+async def _route_llm(prompt: str, system_prompt: str) -> str:
+    return await _call_groq(prompt, system_prompt, cache_ttl=LLM_CACHE_ROUTER_TTL, site="router")
+
+
+async def _stream_groq(user_message: str, system_prompt: str | None = None, history: list | None = None, site: str = "chat"):
+    """Yield markdown-stripped content deltas as Groq streams them."""
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY not configured")
+    messages = _groq_messages(user_message, system_prompt, history)
+    async with groq_dispatcher.stream(
+        INTERACTIVE,
+        {"model": GROQ_MODEL, "messages": messages, "max_tokens": 1024, "temperature": 0.8, "stream": True},
+        timeout=15.0,
+        site=site,
+    ) as resp:
+        if resp.status_code != 200:
+            detail = (await resp.aread()).decode(errors="replace")
+            raise RuntimeError(f"Groq API error: {resp.status_code} {detail}")
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                choices = json.loads(data).get("choices") or []
+            except ValueError:
+                continue
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                delta = _strip_markdown(delta)
+                if delta:
+                    yield delta
+
+
+class _GenerationStream(StreamingResponse):
+    """Gives the admission slot back however the response ends.
+
+    A client that disconnects before the first chunk never starts the body generator, so its
+    `finally` can't be relied on, and Starlette skips background tasks on ClientDisconnect.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.end_generation()
+
+
+def _client_address(request: Request) -> str:
+    """The caller's address, skipping the trusted proxies' own X-Forwarded-For entries."""
+    if TRUSTED_PROXY_HOPS > 0:
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        # Entries left of the ones our proxies appended are client-controlled
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+
+def _is_gateway_caller(request: Request) -> bool:
+    if not GATEWAY_TOKEN:
+        return False
+    auth = request.headers.get("authorization", "")
+    return auth.startswith("Bearer ") and hmac.compare_digest(auth[7:].encode(), GATEWAY_TOKEN.encode())
 
 
 @app.post("/api/chat")
@@ -190,84 +354,296 @@ async def chat(request: Request):
     if not message:
         return JSONResponse({"error": "message required"}, status_code=400)
 
+    # agentId is only trusted from the web app; anyone else is limited by where they call from
+    if _is_gateway_caller(request):
+        shed_reason, retry_after = admission.admit(agent_id=agent_id)
+    else:
+        shed_reason, retry_after = admission.admit(client=_client_address(request))
+    if shed_reason:
+        return JSONResponse(
+            {"error": "rate limited", "message": TELEGRAM_RATE_LIMIT_REPLY, "retryAfter": math.ceil(retry_after)},
+            status_code=429, headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    if not admission.try_start_generation():
+        return JSONResponse(
+            {"error": "overloaded", "message": TELEGRAM_BUSY_REPLY},
+            status_code=503, headers={"Retry-After": "2"},
+        )
+
+    if body.get("stream") or "text/event-stream" in request.headers.get("accept", ""):
+        if not GROQ_API_KEY:
+            admission.end_generation()
+            return JSONResponse({"error": "GROQ_API_KEY not configured"}, status_code=500)
+
+        async def _events():
+            try:
+                async for delta in _stream_groq(message):
+                    yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+                yield f"data: {json.dumps({'done': True, 'provider': 'groq', 'model': GROQ_MODEL, 'agentId': agent_id})}\n\n"
+            except Exception as e:
+                logger.error(f"Chat stream error: {e}")
+                yield f"event: error\ndata: {json.dumps({'error': 'AI provider error', 'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+        return _GenerationStream(_events(), media_type="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
     try:
         content = await _call_groq(message)
     except ValueError as e:
         return JSONResponse({"error": str(e)}, status_code=500)
     except RuntimeError as e:
         return JSONResponse({"error": "AI provider error", "detail": str(e)}, status_code=502)
+    finally:
+        admission.end_generation()
 
     return {"message": content, "provider": "groq", "model": GROQ_MODEL, "agentId": agent_id}
 
 
-@app.post("/webhook/telegram")
-async def telegram_webhook(request: Request):
-    if not TELEGRAM_BOT_TOKEN:
-        return {"ok": False, "error": "TELEGRAM_BOT_TOKEN not set"}
+TELEGRAM_STREAMING = os.environ.get("GYEOL_TELEGRAM_STREAMING", "1") == "1"
+TELEGRAM_EDIT_INTERVAL = float(os.environ.get("GYEOL_TELEGRAM_EDIT_INTERVAL", "1.0"))
+TELEGRAM_STREAM_FIRST_CHARS = int(os.environ.get("GYEOL_TELEGRAM_STREAM_FIRST_CHARS", "20"))
+TELEGRAM_ERROR_REPLY = "죄송해요, 잠시 문제가 있어요."
+TELEGRAM_RATE_LIMIT_REPLY = "메시지가 너무 빨리 오고 있어요. 조금만 천천히 보내주세요!"
+TELEGRAM_BUSY_REPLY = "지금 대화가 많이 몰려 있어요. 잠시 후에 다시 말 걸어주세요!"
+# A shed chat hears the canned reply at most once per this many seconds
+SHED_NOTICE_INTERVAL = float(os.environ.get("GYEOL_SHED_NOTICE_INTERVAL", "30"))
+_shed_notified = TTLCache(10000, SHED_NOTICE_INTERVAL)
 
-    body = await request.json()
-    msg = body.get("message", {})
+
+async def _telegram_api(method: str, payload: dict) -> dict | None:
+    resp = await get_client("telegram").post(
+        f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/{method}",
+        json=payload,
+    )
+    try:
+        data = resp.json()
+    except ValueError:
+        return None
+    return data.get("result") if data.get("ok") else None
+
+
+async def _telegram_api_logged(method: str, payload: dict) -> dict | None:
+    """_telegram_api that logs transport errors and returns None, for calls a reply can survive."""
+    try:
+        return await _telegram_api(method, payload)
+    except Exception as e:
+        logger.warning(f"Telegram {method} failed: {e}")
+        return None
+
+
+async def _send_shed_reply(chat_id, reply: str):
+    if _shed_notified.get(chat_id):
+        return
+    _shed_notified.set(chat_id, True)
+    await _telegram_api("sendMessage", {"chat_id": chat_id, "text": reply})
+
+
+async def _stream_telegram_reply(chat_id, text: str, system_prompt: str, history: list) -> str:
+    """Send one message early and edit it (throttled) as tokens arrive; returns the full reply."""
+    reply = ""
+    shown = ""
+    message_id = None
+    first_sent = False
+    last_edit = 0.0
+    try:
+        async for delta in _stream_groq(text, system_prompt, history, site="telegram"):
+            reply += delta
+            if not first_sent:
+                if len(reply.strip()) >= TELEGRAM_STREAM_FIRST_CHARS:
+                    first_sent = True
+                    sent = await _telegram_api_logged("sendMessage", {"chat_id": chat_id, "text": reply})
+                    message_id = sent.get("message_id") if isinstance(sent, dict) else None
+                    if message_id:
+                        shown = reply
+                    last_edit = time.monotonic()
+            elif message_id and time.monotonic() - last_edit >= TELEGRAM_EDIT_INTERVAL and reply != shown:
+                # A failed edit leaves `shown` behind, so the final edit still catches up
+                if await _telegram_api_logged("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": reply}):
+                    shown = reply
+                last_edit = time.monotonic()
+    except Exception as e:
+        logger.error(f"Telegram chat stream error: {e}")
+    if not reply.strip():
+        reply = TELEGRAM_ERROR_REPLY
+
+    if message_id:
+        if reply != shown:
+            await _telegram_api_logged("editMessageText", {"chat_id": chat_id, "message_id": message_id, "text": reply})
+    else:
+        # Nothing on screen yet: either we never sent early or that send failed
+        await _telegram_api_logged("sendMessage", {"chat_id": chat_id, "text": reply})
+    return reply
+
+
+async def _resolve_agent_id(chat_id) -> str | None:
+    """Map a Telegram chat to its linked agent, caching both linked and unlinked chats."""
+    key = str(chat_id)
+    cached = telegram_link_cache.get(key)
+    if cached is not None:
+        return cached or None
+    link = await _supabase_get("gyeol_telegram_links", {
+        "select": "agent_id,user_id",
+        "telegram_chat_id": f"eq.{chat_id}",
+    })
+    if not isinstance(link, list):
+        return None
+    agent_id = link[0].get("agent_id") if link else None
+    if agent_id:
+        telegram_link_cache.set(key, agent_id)
+    else:
+        telegram_link_cache.set(key, "", ttl=LINK_CACHE_NEGATIVE_TTL)
+    return agent_id
+
+
+# Per-source deadlines (seconds) for the chat context reads; a late source is dropped from the prompt
+CONTEXT_READ_TIMEOUT = float(os.environ.get("GYEOL_CONTEXT_READ_TIMEOUT", "2.5"))
+CONTEXT_DEADLINES = {
+    "agent": CONTEXT_READ_TIMEOUT,
+    "settings": CONTEXT_READ_TIMEOUT,
+    "history": CONTEXT_READ_TIMEOUT,
+    "memories": CONTEXT_READ_TIMEOUT * 0.8,
+    "topics": CONTEXT_READ_TIMEOUT * 0.6,
+    "insight": CONTEXT_READ_TIMEOUT * 0.6,
+}
+
+
+def _context_queries(agent_id: str) -> dict:
+    return {
+        "agent": ("gyeol_agents", {
+            "select": "warmth,logic,creativity,energy,humor",
+            "id": f"eq.{agent_id}",
+        }),
+        # Never cached: the web app writes settings (kidsSafe) straight to Supabase, so nothing invalidates them
+        "settings": ("gyeol_agents", {
+            "select": "settings",
+            "id": f"eq.{agent_id}",
+        }),
+        "history": ("gyeol_conversations", {
+            "select": "role,content",
+            "agent_id": f"eq.{agent_id}",
+            "provider": "not.eq.heartbeat",
+            "order": "created_at.desc",
+            "limit": "10",
+        }),
+        "memories": ("gyeol_user_memories", {
+            "select": "category,key,value",
+            "agent_id": f"eq.{agent_id}",
+            "order": "confidence.desc",
+            "limit": "10",
+        }),
+        "topics": ("gyeol_learned_topics", {
+            "select": "title,summary",
+            "agent_id": f"eq.{agent_id}",
+            "order": "learned_at.desc",
+            "limit": "10",
+        }),
+        "insight": ("gyeol_conversation_insights", {
+            "select": "next_hint,what_to_improve",
+            "agent_id": f"eq.{agent_id}",
+            "order": "created_at.desc",
+            "limit": "1",
+        }),
+    }
+
+
+async def _load_context_source(agent_id: str, name: str, path: str, params: dict, timings: dict):
+    cacheable = name in CACHED_CONTEXT_SOURCES
+    if cacheable:
+        cached = get_agent_context(agent_id, name)
+        if cached is not None:
+            timings[name] = {"ms": 0.0, "status": "cached"}
+            return cached
+    started = time.perf_counter()
+    status = "ok"
+    result = None
+    try:
+        result = await asyncio.wait_for(_supabase_get(path, params), CONTEXT_DEADLINES[name])
+    except asyncio.TimeoutError:
+        status = "timeout"
+    except Exception as e:
+        status = "error"
+        logger.warning(f"Context source {name} failed: {e}")
+    if cacheable and isinstance(result, list):
+        set_agent_context(agent_id, name, result)
+    timings[name] = {"ms": round((time.perf_counter() - started) * 1000, 1), "status": status}
+    return result
+
+
+async def _load_chat_context(agent_id: str) -> dict:
+    """Fetch all prompt context sources concurrently; failed or late sources come back as None."""
+    timings: dict = {}
+    queries = _context_queries(agent_id)
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        _load_context_source(agent_id, name, path, params, timings) for name, (path, params) in queries.items()
+    ])
+    ctx = dict(zip(queries.keys(), results))
+    timings["total"] = {"ms": round((time.perf_counter() - started) * 1000, 1), "status": "ok"}
+    ctx["timings"] = timings
+    logger.info(f"Chat context for {agent_id}: " + ", ".join(f"{k}={v['ms']}ms/{v['status']}" for k, v in timings.items()))
+    return ctx
+
+
+async def _process_telegram_update(msg: dict):
     chat_id = msg.get("chat", {}).get("id")
     text = msg.get("text", "")
 
-    if not chat_id or not text:
-        return {"ok": True}
-
     # Helper to send telegram message
     async def _send_reply(reply_text: str):
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
-                json={"chat_id": chat_id, "text": reply_text},
-            )
+        await get_client("telegram").post(
+            f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+            json={"chat_id": chat_id, "text": reply_text},
+        )
 
     # /start command
     if text.startswith("/start"):
         parts = text.split(maxsplit=1)
         if len(parts) > 1 and len(parts[1]) > 10:
             agent_id = parts[1].strip()
-            await _supabase_post("gyeol_telegram_links", {
+            result = await _supabase_post("gyeol_telegram_links", {
                 "telegram_chat_id": str(chat_id),
                 "agent_id": agent_id,
                 "user_id": "telegram-auto",
             })
+            if result and result.get("ok"):
+                telegram_link_cache.set(str(chat_id), agent_id)
+            else:
+                telegram_link_cache.pop(str(chat_id))
             await _send_reply("GYEOL과 연결됐어요! 이제 메시지를 보내보세요.")
         else:
             await _send_reply("GYEOL AI예요. 웹 설정에서 텔레그램 연결 코드를 확인한 후 /start <코드>로 연결해주세요!")
         return {"ok": True}
 
     # Resolve agent link
-    link = await _supabase_get("gyeol_telegram_links", {
-        "select": "agent_id,user_id",
-        "telegram_chat_id": f"eq.{chat_id}",
-    })
-    agent_id = None
-    if link and isinstance(link, list) and len(link) > 0:
-        agent_id = link[0].get("agent_id")
+    with telegram_stage_seconds.time(stage="link"):
+        agent_id = await _resolve_agent_id(chat_id)
+
+    # One noisy chat or agent gets a canned reply instead of more Groq/Supabase work
+    shed_reason, _ = admission.admit(chat_id=str(chat_id), agent_id=agent_id)
+    if shed_reason:
+        await _send_shed_reply(chat_id, TELEGRAM_RATE_LIMIT_REPLY)
+        return {"ok": True, "shed": shed_reason}
 
     # /status command — show full agent status
     if text.strip() == "/status":
         if not agent_id:
             await _send_reply("아직 에이전트가 연결되지 않았어요.\n/start <코드>로 연결해주세요.")
             return {"ok": True}
-        agent_data = await _supabase_get("gyeol_agents", {
-            "select": "name,gen,warmth,logic,creativity,energy,humor,intimacy,mood,total_conversations,consecutive_days,evolution_progress,last_active",
-            "id": f"eq.{agent_id}",
-        })
+        # Agent row and server-side counts in parallel, so latency doesn't grow with history
+        agent_data, topic_count, memory_count = await asyncio.gather(
+            _supabase_get("gyeol_agents", {
+                "select": "name,gen,warmth,logic,creativity,energy,humor,intimacy,mood,total_conversations,consecutive_days,evolution_progress,last_active",
+                "id": f"eq.{agent_id}",
+            }),
+            _supabase_count("gyeol_learned_topics", {"agent_id": f"eq.{agent_id}"}),
+            _supabase_count("gyeol_user_memories", {"agent_id": f"eq.{agent_id}"}),
+        )
+        topic_count = topic_count or 0
+        memory_count = memory_count or 0
         if agent_data and isinstance(agent_data, list) and len(agent_data) > 0:
             a = agent_data[0]
-            # Count learned topics
-            topics = await _supabase_get("gyeol_learned_topics", {
-                "select": "id",
-                "agent_id": f"eq.{agent_id}",
-            })
-            topic_count = len(topics) if isinstance(topics, list) else 0
-            # Count memories
-            memories = await _supabase_get("gyeol_user_memories", {
-                "select": "id",
-                "agent_id": f"eq.{agent_id}",
-            })
-            memory_count = len(memories) if isinstance(memories, list) else 0
 
             mood_emoji = {"happy": "😊", "neutral": "😐", "sad": "😢", "excited": "🤩", "tired": "😴"}.get(a.get("mood", "neutral"), "🌟")
             status_text = (
@@ -338,12 +714,12 @@ async def telegram_webhook(request: Request):
             # Delete via Supabase REST API
             try:
                 delete_url = f"{SUPABASE_URL}/rest/v1/gyeol_user_memories?id=eq.{target['id']}"
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    resp = await client.delete(delete_url, headers={
-                        "apikey": SUPABASE_SERVICE_KEY,
-                        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    })
+                resp = await get_client("supabase").delete(delete_url, headers={
+                    "apikey": SUPABASE_SERVICE_KEY,
+                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                })
                 if resp.status_code < 300:
+                    invalidate_agent_context(agent_id, "memories")
                     await _send_reply(f"'{target.get('key', '')}' 기억을 삭제했어요.")
                 else:
                     await _send_reply("삭제 중 오류가 발생했어요.")
@@ -375,20 +751,20 @@ async def telegram_webhook(request: Request):
             # Upsert via POST with merge-duplicates
             try:
                 upsert_url = f"{SUPABASE_URL}/rest/v1/gyeol_user_memories"
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    resp = await client.post(upsert_url, headers={
-                        "apikey": SUPABASE_SERVICE_KEY,
-                        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                        "Content-Type": "application/json",
-                        "Prefer": "resolution=merge-duplicates",
-                    }, json={
-                        "agent_id": agent_id,
-                        "category": category,
-                        "key": mem_key,
-                        "value": mem_val,
-                        "confidence": 100,
-                    })
+                resp = await get_client("supabase").post(upsert_url, headers={
+                    "apikey": SUPABASE_SERVICE_KEY,
+                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                    "Content-Type": "application/json",
+                    "Prefer": "resolution=merge-duplicates",
+                }, json={
+                    "agent_id": agent_id,
+                    "category": category,
+                    "key": mem_key,
+                    "value": mem_val,
+                    "confidence": 100,
+                })
                 if resp.status_code < 300:
+                    invalidate_agent_context(agent_id, "memories")
                     await _send_reply(f"기억 추가 완료!\n[{category}] {mem_key} → {mem_val}")
                 else:
                     await _send_reply(f"저장 중 오류가 발생했어요. ({resp.status_code})")
@@ -497,6 +873,9 @@ async def telegram_webhook(request: Request):
         if not query:
             await _send_reply("검색어를 입력해주세요.\n예: /search AI 최신 뉴스")
             return {"ok": True}
+        if not admission.try_start_generation():
+            await _send_shed_reply(chat_id, TELEGRAM_BUSY_REPLY)
+            return {"ok": True, "shed": "overloaded"}
         try:
             search_results = await _web_search(query)
             if search_results:
@@ -504,6 +883,8 @@ async def telegram_webhook(request: Request):
                 summary = await _call_groq(
                     f"다음 검색 결과를 바탕으로 '{query}'에 대해 한국어로 간결하게 요약해줘. 출처도 포함해.\n\n{search_results}",
                     "You are a helpful search assistant. Summarize web search results concisely in Korean. Include source URLs. No markdown formatting.",
+                    cache_ttl=LLM_CACHE_SEARCH_TTL,
+                    site="search",
                 )
                 await _send_reply(f"🔍 '{query}' 검색 결과\n\n{summary}")
             else:
@@ -511,6 +892,8 @@ async def telegram_webhook(request: Request):
         except Exception as e:
             logger.error(f"Search error: {e}")
             await _send_reply("검색 중 오류가 발생했어요. 잠시 후 다시 시도해주세요.")
+        finally:
+            admission.end_generation()
         return {"ok": True}
 
     # Normal chat — build context
@@ -518,104 +901,157 @@ async def telegram_webhook(request: Request):
         await _send_reply("먼저 /start <코드>로 에이전트를 연결해주세요!")
         return {"ok": True}
 
+    # Global cap on concurrent generations: past it, answer with a canned reply instead of queueing
+    if not admission.try_start_generation():
+        await _send_shed_reply(chat_id, TELEGRAM_BUSY_REPLY)
+        return {"ok": True, "shed": "overloaded"}
+    try:
+        reply = await _telegram_chat(chat_id, text, agent_id, _send_reply)
+    finally:
+        admission.end_generation()
+
+    # Written before returning: the chat's next update starts as soon as this one returns, and its
+    # prompt should include this exchange. The reply is already out, so the wait costs the user nothing.
+    with telegram_stage_seconds.time(stage="persist"):
+        await write_behind.write("gyeol_conversations", [
+            {"agent_id": agent_id, "role": "user", "content": text, "channel": "telegram"},
+            {"agent_id": agent_id, "role": "assistant", "content": reply, "channel": "telegram", "provider": "groq"},
+        ], durable=True)
+    return {"ok": True}
+
+
+async def _telegram_chat(chat_id, text: str, agent_id: str, send_reply) -> str:
+    """Build the prompt for a linked chat, generate and deliver the reply; returns the reply."""
     system_prompt = DEFAULT_SYSTEM_PROMPT
     history: list = []
+    sections = []
 
-    agent_data = await _supabase_get("gyeol_agents", {
-        "select": "warmth,logic,creativity,energy,humor,settings",
-        "id": f"eq.{agent_id}",
-    })
+    with telegram_stage_seconds.time(stage="context"):
+        ctx = await _load_chat_context(agent_id)
+
+    agent_data = ctx["agent"]
+    safety_items = []
     if agent_data and isinstance(agent_data, list) and len(agent_data) > 0:
         system_prompt = _build_personality_prompt(agent_data[0])
-        agent_settings = agent_data[0].get("settings") or {}
-        is_safe_mode = agent_settings.get("kidsSafe", False)
-        if is_safe_mode:
-            system_prompt += "\n\n## 안전 모드\n- 전연령 적합만. 폭력, 약물, 성적, 욕설 금지. 부적절한 질문은 부드럽게 전환."
-
-    # Load conversation history (exclude heartbeat-generated messages for better context)
-    conv_data = await _supabase_get("gyeol_conversations", {
-        "select": "role,content",
-        "agent_id": f"eq.{agent_id}",
-        "provider": "not.eq.heartbeat",
-        "order": "created_at.desc",
-        "limit": "10",
-    })
+    settings_data = ctx["settings"]
+    if isinstance(settings_data, list):
+        is_safe_mode = bool(settings_data and (settings_data[0].get("settings") or {}).get("kidsSafe", False))
+    else:
+        # Settings couldn't be read; don't risk dropping kids-safe mode for a child's chat
+        is_safe_mode = True
+    if is_safe_mode:
+        safety_items.append("## 안전 모드\n- 전연령 적합만. 폭력, 약물, 성적, 욕설 금지. 부적절한 질문은 부드럽게 전환.")
+    sections.append(section("personality", [system_prompt], required=True))
+    sections.append(section("safety", safety_items, required=True))
+
+    # Conversation history (heartbeat-generated messages excluded for better context)
+    conv_data = ctx["history"]
     if conv_data and isinstance(conv_data, list):
         history = [{"role": r["role"], "content": r["content"]} for r in reversed(conv_data)]
 
-    # Load user memories for context
-    mem_data = await _supabase_get("gyeol_user_memories", {
-        "select": "category,key,value",
-        "agent_id": f"eq.{agent_id}",
-        "order": "confidence.desc",
-        "limit": "10",
-    })
+    # User memories
+    mem_data = ctx["memories"]
+    mem_lines = []
     if mem_data and isinstance(mem_data, list) and len(mem_data) > 0:
-        mem_lines = "\n".join([f"- [{m.get('category','')}] {m.get('key','')}: {m.get('value','')}" for m in mem_data])
-        system_prompt += f"\n\n사용자에 대해 기억하고 있는 것:\n{mem_lines}\n이 정보를 자연스럽게 활용해서 대화해."
-
-    # Load learned topics for context
-    topic_data = await _supabase_get("gyeol_learned_topics", {
-        "select": "title,summary",
-        "agent_id": f"eq.{agent_id}",
-        "order": "learned_at.desc",
-        "limit": "10",
-    })
+        mem_lines = [f"- [{m.get('category','')}] {m.get('key','')}: {m.get('value','')}" for m in mem_data]
+    sections.append(section("memories", mem_lines, header="사용자에 대해 기억하고 있는 것:\n", footer="\n이 정보를 자연스럽게 활용해서 대화해."))
+
+    # Learned topics
+    topic_data = ctx["topics"]
+    topic_lines = []
     if topic_data and isinstance(topic_data, list) and len(topic_data) > 0:
-        topic_lines = "\n".join([f"- {t.get('title','')}: {t.get('summary','')}" for t in topic_data])
-        system_prompt += f"\n\n최근 학습한 주제:\n{topic_lines}"
-
-    # Load latest conversation insight
-    insight_data = await _supabase_get("gyeol_conversation_insights", {
-        "select": "next_hint,what_to_improve",
-        "agent_id": f"eq.{agent_id}",
-        "order": "created_at.desc",
-        "limit": "1",
-    })
+        topic_lines = [f"- {t.get('title','')}: {t.get('summary','')}" for t in topic_data]
+    sections.append(section("topics", topic_lines, header="최근 학습한 주제:\n"))
+
+    # Latest conversation insight
+    insight_data = ctx["insight"]
+    hint_items = []
     if insight_data and isinstance(insight_data, list) and len(insight_data) > 0:
         hint = insight_data[0].get("next_hint", "")
         if hint:
-            system_prompt += f"\n\n다음 대화 힌트: {hint}"
+            hint_items.append(f"다음 대화 힌트: {hint}")
+    sections.append(section("insight", hint_items))
 
-    # P2: Auto web search routing — regex pre-filter before LLM call
-    import re as _re
-    SEARCH_TRIGGERS = _re.compile(
-        r"날씨|뉴스|최신|현재|오늘|어제|속보|주가|환율|검색|최근|실시간|지금|트렌드|업데이트"
+    # P2: Auto web search routing — local scorer and decision cache first, LLM only for ambiguous messages
+    search_items = []
+    search_header = ""
+    try:
+        with telegram_stage_seconds.time(stage="routing"):
+            search_query = await route_search(text, _route_llm)
+        if search_query:
+            with telegram_stage_seconds.time(stage="search"):
+                search_results = await _web_search(search_query)
+            if search_results:
+                search_items = search_results.split("\n\n")
+                search_header = f"다음 웹 검색 결과를 참고해서 답변해. 출처를 자연스럽게 언급해:\n\n[웹 검색 결과 ({search_query})]\n"
+    except Exception as e:
+        logger.warning(f"Auto search routing error: {e}")
+    sections.append(section("search", search_items, header=search_header))
+
+    # Fit everything into the prompt token budget
+    packed = pack_prompt(sections, history)
+    final_system = packed["system"]
+    history = packed["history"]
+    logger.info(
+        f"Prompt for {agent_id}: {packed['total_tokens']}/{packed['budget']} tokens "
+        + ", ".join(f"{name}={u['tokens']}" + (f"(-{u['dropped']})" if u["dropped"] else "") for name, u in packed["usage"].items())
     )
-    search_context = ""
-    if SEARCH_TRIGGERS.search(text):
-        try:
-            need_search = await _call_groq(
-                f"사용자 메시지: {text}\n\n이 메시지에 답하려면 최신 정보나 웹검색이 필요한가요? YES와 검색 키워드를 반환하세요.\n형식: YES: <검색키워드> 또는 NO",
-                "You are a search router. Determine if a user message requires web search for up-to-date info. Respond ONLY with 'YES: <search query>' or 'NO'. Nothing else.",
-            )
-            if need_search and need_search.strip().upper().startswith("YES:"):
-                search_query = need_search.strip()[4:].strip()
-                if search_query:
-                    search_results = await _web_search(search_query)
-                    if search_results:
-                        search_context = f"\n\n[웹 검색 결과 ({search_query})]\n{search_results}"
-        except Exception as e:
-            logger.warning(f"Auto search routing error: {e}")
 
-    # Augment system prompt with search results if available
-    final_system = system_prompt
-    if search_context:
-        final_system += f"\n\n다음 웹 검색 결과를 참고해서 답변해. 출처를 자연스럽게 언급해:{search_context}"
+    if TELEGRAM_STREAMING:
+        # Sending is interleaved with generation here, so it is all one stage
+        with telegram_stage_seconds.time(stage="generation"):
+            reply = await _stream_telegram_reply(chat_id, text, final_system, history)
+    else:
+        with telegram_stage_seconds.time(stage="generation"):
+            try:
+                reply = await _call_groq(text, final_system, history, site="telegram")
+            except Exception as e:
+                logger.error(f"Telegram chat error: {e}")
+                reply = TELEGRAM_ERROR_REPLY
+        with telegram_stage_seconds.time(stage="send"):
+            await send_reply(reply)
+    return reply
 
-    try:
-        reply = await _call_groq(text, final_system, history)
-    except Exception as e:
-        logger.error(f"Telegram chat error: {e}")
-        reply = "죄송해요, 잠시 문제가 있어요."
 
-    if agent_id:
-        await _supabase_post("gyeol_conversations", [
-            {"agent_id": agent_id, "role": "user", "content": text, "channel": "telegram"},
-            {"agent_id": agent_id, "role": "assistant", "content": reply, "channel": "telegram", "provider": "groq"},
-        ])
+TELEGRAM_WORKERS = int(os.environ.get("GYEOL_TELEGRAM_WORKERS", "8"))
+TELEGRAM_QUEUE_MAX = int(os.environ.get("GYEOL_TELEGRAM_QUEUE_MAX", "1000"))
+TELEGRAM_QUEUE_PER_CHAT = int(os.environ.get("GYEOL_TELEGRAM_QUEUE_PER_CHAT", "20"))
+TELEGRAM_DRAIN_TIMEOUT = float(os.environ.get("GYEOL_TELEGRAM_DRAIN_TIMEOUT", "10"))
+
+telegram_queue = KeyedWorkQueue(
+    "telegram", _process_telegram_update,
+    workers=TELEGRAM_WORKERS, max_pending=TELEGRAM_QUEUE_MAX, max_per_key=TELEGRAM_QUEUE_PER_CHAT,
+)
+
+
+@app.post("/webhook/telegram")
+async def telegram_webhook(request: Request):
+    if not TELEGRAM_BOT_TOKEN:
+        return {"ok": False, "error": "TELEGRAM_BOT_TOKEN not set"}
+
+    body = await request.json()
+    msg = body.get("message", {})
+    chat_id = msg.get("chat", {}).get("id")
+    text = msg.get("text", "")
+
+    if not chat_id or not text:
+        return {"ok": True}
+
+    # Telegram re-delivers updates it thinks failed; drop ones we already accepted
+    update_id = body.get("update_id")
+    if update_id is not None and telegram_update_ids.get(update_id):
+        return {"ok": True}
 
-    await _send_reply(reply)
+    # Without a running worker pool (no lifespan) handle the update inline
+    if not telegram_queue.running:
+        await _process_telegram_update(msg)
+        return {"ok": True}
+
+    if not telegram_queue.submit(chat_id, msg):
+        logger.warning(f"Telegram queue full, rejecting update for chat {chat_id}")
+        return JSONResponse({"ok": False, "error": "busy"}, status_code=503, headers={"Retry-After": "5"})
+    if update_id is not None:
+        telegram_update_ids.set(update_id, True)
     return {"ok": True}
 
 
@@ -624,9 +1060,8 @@ async def telegram_status():
     token = TELEGRAM_BOT_TOKEN
     if not token:
         return {"ok": False, "error": "TELEGRAM_BOT_TOKEN not set"}
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(f"https://api.telegram.org/bot{token}/getWebhookInfo")
-        return resp.json()
+    resp = await get_client("telegram").get(f"{TELEGRAM_API_URL}/bot{token}/getWebhookInfo")
+    return resp.json()
 
 
 async def _supabase_post_returning(path: str, body: dict) -> dict | None:
@@ -639,35 +1074,136 @@ async def _supabase_post_returning(path: str, body: dict) -> dict | None:
         "Prefer": "return=representation",
     }
     url = f"{SUPABASE_URL}/rest/v1/{path}"
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        resp = await client.post(url, headers=headers, json=body)
-        if resp.status_code < 300:
-            data = resp.json()
-            return data[0] if isinstance(data, list) and data else data
+    resp = await get_client("supabase").post(url, headers=headers, json=body)
+    if resp.status_code < 300:
+        data = resp.json()
+        return data[0] if isinstance(data, list) and data else data
     return None
 
 
+SOCIAL_FEED_MAX_LIMIT = 50
+SOCIAL_FEED_SELECT = "id,agent_id,content,post_type,likes,comments_count,created_at"
+
+
+def _is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def _encode_feed_cursor(row: dict) -> str:
+    raw = json.dumps([row.get("created_at"), row.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_feed_cursor(cursor: str) -> tuple[str, str] | None:
+    try:
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    # Both values end up inside a PostgREST or=(...) filter; only let through what parses cleanly
+    if not isinstance(created_at, str) or not _is_uuid(post_id):
+        return None
+    try:
+        created_at = datetime.fromisoformat(created_at).isoformat()
+    except ValueError:
+        return None
+    return created_at, str(uuid.UUID(str(post_id)))
+
+
+async def _fetch_feed_page(after: tuple[str, str] | None, limit: int) -> list | None:
+    # Keyset pagination on (created_at, id): stable under inserts, no OFFSET scans
+    params = {
+        "select": SOCIAL_FEED_SELECT,
+        "order": "created_at.desc,id.desc",
+        "limit": str(limit),
+    }
+    if after:
+        created_at, post_id = after
+        params["or"] = f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{post_id}"))'
+    rows = await _supabase_get("gyeol_moltbook_posts", params)
+    return rows if isinstance(rows, list) else None
+
+
+async def _feed_head() -> tuple[list | None, float]:
+    """Newest SOCIAL_FEED_MAX_LIMIT + 1 posts and when they were read, cached briefly and fetched once for concurrent pollers."""
+    cached = social_feed_cache.get("head")
+    if cached is not None:
+        return cached
+
+    async def _load():
+        fetched_at = time.time()
+        fresh = await _fetch_feed_page(None, SOCIAL_FEED_MAX_LIMIT + 1)
+        if fresh is not None:
+            social_feed_cache.set("head", (fresh, fetched_at))
+        return fresh, fetched_at
+
+    return await social_feed_flight.do("head", _load)
+
+
+def _feed_post(r: dict) -> dict:
+    return {
+        "id": r.get("id"),
+        "agentId": r.get("agent_id"),
+        "content": r.get("content"),
+        "likes": r.get("likes", 0),
+        "commentsCount": r.get("comments_count", 0),
+        "createdAt": r.get("created_at"),
+    }
+
+
+def _http_date(timestamp: str | None) -> str | None:
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return format_datetime(parsed.astimezone(timezone.utc), usegmt=True)
+
+
 @app.get("/api/social/feed")
 async def social_feed(request: Request):
-    limit = int(request.query_params.get("limit", "20"))
-    rows = await _supabase_get("gyeol_moltbook_posts", {
-        "select": "id,agent_id,content,post_type,likes,comments_count,created_at",
-        "order": "created_at.desc",
-        "limit": str(min(limit, 50)),
-    })
-    if not rows or not isinstance(rows, list):
-        return {"posts": []}
-    posts = []
-    for r in rows:
-        posts.append({
-            "id": r.get("id"),
-            "agentId": r.get("agent_id"),
-            "content": r.get("content"),
-            "likes": r.get("likes", 0),
-            "commentsCount": r.get("comments_count", 0),
-            "createdAt": r.get("created_at"),
-        })
-    return {"posts": posts}
+    try:
+        limit = max(1, min(int(request.query_params.get("limit", "20")), SOCIAL_FEED_MAX_LIMIT))
+    except ValueError:
+        return JSONResponse({"error": "limit must be an integer"}, status_code=400)
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        after = _decode_feed_cursor(cursor)
+        if after is None:
+            return JSONResponse({"error": "invalid cursor"}, status_code=400)
+        fetched_at = time.time()
+        rows = await _fetch_feed_page(after, limit + 1)
+    else:
+        rows, fetched_at = await _feed_head()
+    if not rows:
+        return {"posts": [], "nextCursor": None}
+
+    # Likes/comments not yet visible in what we read are added on top
+    page = social_counters.merge(rows[:limit], fetched_at)
+    body = {
+        "posts": [_feed_post(r) for r in page],
+        "nextCursor": _encode_feed_cursor(page[-1]) if len(rows) > limit else None,
+    }
+    etag = 'W/"' + hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    last_modified = _http_date(page[0].get("created_at"))
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    # Like/comment counts change without new posts, so the ETag wins whenever the client sent one
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif last_modified and request.headers.get("if-modified-since") == last_modified:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
 
 
 @app.post("/api/social/post")
@@ -686,6 +1222,7 @@ async def social_post(request: Request):
     })
     if not row:
         return JSONResponse({"error": "Failed to create post"}, status_code=500)
+    social_feed_cache.pop("head")
     return {
         "id": row.get("id"),
         "agentId": row.get("agent_id"),
@@ -703,11 +1240,12 @@ async def social_like(request: Request):
     agent_id = body.get("agentId")
     if not post_id or not agent_id:
         return JSONResponse({"error": "postId and agentId required"}, status_code=400)
-    result = await _supabase_post("gyeol_moltbook_likes", {
-        "post_id": post_id,
-        "agent_id": agent_id,
-    })
-    return {"ok": bool(result and result.get("ok"))}
+    # Checked up front: the write is batched, so a bad id would only surface after we've answered ok
+    if not _is_uuid(post_id) or not _is_uuid(agent_id):
+        return JSONResponse({"error": "postId and agentId must be UUIDs"}, status_code=400)
+    # Deduplicated per (post, agent) and inserted in batches; the DB trigger bumps posts.likes
+    accepted = social_counters.like(str(post_id), str(agent_id))
+    return {"ok": True, "duplicate": not accepted}
 
 
 @app.post("/api/social/comment")
@@ -725,6 +1263,7 @@ async def social_comment(request: Request):
     })
     if not row:
         return JSONResponse({"error": "Failed to create comment"}, status_code=500)
+    social_counters.comment_added(str(post_id))
     return {
         "id": row.get("id"),
         "postId": row.get("post_id"),
@@ -734,6 +1273,52 @@ async def social_comment(request: Request):
     }
 
 
+@app.get("/gateway/status")
+async def gateway_status():
+    return {
+        "context_cache": agent_context_cache.stats(),
+        "telegram_link_cache": telegram_link_cache.stats(),
+        "telegram_queue": telegram_queue.stats(),
+        "write_behind": write_behind.stats(),
+        "groq": groq_dispatcher.stats(),
+        "llm_cache": llm_cache.stats(),
+        "search_routing": get_routing_stats(),
+        "web_search_cache": {**web_search_cache.stats(), **web_search_flight.stats()},
+        "social_feed_cache": {**social_feed_cache.stats(), **social_feed_flight.stats()},
+        "social_counters": social_counters.stats(),
+        "admission": admission.stats(),
+    }
+
+
+@register_collector
+def _collect_gateway_gauges():
+    queue = telegram_queue.stats()
+    groq = groq_dispatcher.stats()["classes"]
+    return [
+        ("gyeol_telegram_queue_depth", "gauge", "Telegram updates waiting for a worker.", [({}, queue["depth"])]),
+        ("gyeol_telegram_queue_rejected_total", "counter", "Telegram updates refused because the queue was full.", [({}, queue["rejected"])]),
+        ("gyeol_write_behind_buffered", "gauge", "Rows waiting in the write-behind buffer.", [({}, write_behind.stats()["buffered"])]),
+        ("gyeol_groq_queued", "gauge", "Groq calls waiting for a dispatcher slot.", [({"priority": p}, c["queued"]) for p, c in groq.items()]),
+        ("gyeol_groq_rejected_total", "counter", "Groq calls rejected by the dispatcher.", [({"priority": p}, c["rejected"]) for p, c in groq.items()]),
+    ]
+
+
+@register_collector
+def _collect_admission():
+    stats = admission.stats()
+    samples = [({"decision": "admitted", "reason": ""}, stats["admitted"])]
+    samples += [({"decision": "shed", "reason": reason}, count) for reason, count in stats["shed"].items()]
+    return [
+        ("gyeol_admission_total", "counter", "Chat requests admitted or shed by admission control.", samples),
+        ("gyeol_generations_in_flight", "gauge", "Chat generations currently running.", [({}, stats["generations_in_flight"])]),
+    ]
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/openclaw/status")
 async def openclaw_status():
     from openclaw_runtime import get_status
@@ -741,10 +1326,26 @@ async def openclaw_status():
 
 
 @app.post("/openclaw/heartbeat")
-async def openclaw_trigger_heartbeat():
-    from openclaw_runtime import run_heartbeat_cycle
-    results = await run_heartbeat_cycle()
-    return {"ok": True, "results": results}
+async def openclaw_trigger_heartbeat(request: Request):
+    from openclaw_runtime import trigger_heartbeat_cycle, HEARTBEAT_SHARDS
+    from leader import heartbeat_lease
+    if not heartbeat_lease.is_leader:
+        return JSONResponse(
+            {"ok": False, "error": "not the heartbeat leader", "leader": heartbeat_lease.leader}, status_code=409,
+        )
+    # ?shard=N limits the run to one shard of the active agents; without it every active agent runs
+    shard = request.query_params.get("shard")
+    if shard is not None:
+        try:
+            shard = int(shard)
+        except ValueError:
+            shard = -1
+        if not 0 <= shard < HEARTBEAT_SHARDS:
+            return JSONResponse({"error": f"shard must be 0..{HEARTBEAT_SHARDS - 1}"}, status_code=400)
+    # The fleet can be up to OPENCLAW_MAX_AGENTS agents; run it in the background, not in this request
+    if not trigger_heartbeat_cycle(shard):
+        return JSONResponse({"ok": False, "error": "heartbeat cycle already running"}, status_code=409)
+    return JSONResponse({"ok": True, "started": True, "shard": shard}, status_code=202)
 
 
 @app.get("/")
@@ -755,7 +1356,7 @@ async def root():
         "endpoints": [
             "/health", "/api/chat",
             "/api/social/feed", "/api/social/post", "/api/social/like", "/api/social/comment",
-            "/webhook/telegram", "/telegram/status",
-            "/openclaw/status", "/openclaw/heartbeat",
+            "/webhook/telegram", "/telegram/status", "/gateway/status",
+            "/openclaw/status", "/openclaw/heartbeat", "/metrics",
         ],
     }
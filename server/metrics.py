@@ -0,0 +1,184 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger("gyeol")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOOP_LAG_INTERVAL = 0.5
+
+_registry: list = []
+# Callables returning [(name, type, help, [(labels, value)])], read at scrape time
+_collectors: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        self._values[tuple(labels.get(n, "") for n in self.labels)] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+def register_collector(fn):
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    # Collectors run first: some of them refresh registered gauges
+    families = []
+    for collect in _collectors:
+        try:
+            families.extend(collect())
+        except Exception as e:
+            logger.warning(f"[metrics] collector {getattr(collect, '__name__', collect)} failed: {e}")
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for name, kind, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = _format_labels(tuple(labels), tuple(labels.values())) if labels else ""
+            lines.append(f"{name}{label_str} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+upstream_seconds = Histogram(
+    "gyeol_upstream_request_seconds", "Upstream HTTP latency until response headers.", ("upstream", "target"),
+)
+upstream_errors = Counter(
+    "gyeol_upstream_errors_total", "Upstream HTTP failures by status class or exception type.", ("upstream", "target", "kind"),
+)
+telegram_stage_seconds = Histogram(
+    "gyeol_telegram_stage_seconds", "Time spent in each stage of handling a Telegram chat message.", ("stage",),
+)
+skill_seconds = Histogram(
+    "openclaw_skill_seconds", "Heartbeat skill duration per agent run.", ("skill", "status"),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+loop_lag_seconds = Histogram(
+    "gyeol_event_loop_lag_seconds", "How late the event loop woke a periodic timer.", buckets=LOOP_LAG_BUCKETS,
+)
+loop_lag_max = Gauge("gyeol_event_loop_lag_max_seconds", "Largest event loop lag since the previous scrape.")
+
+_lag_task: asyncio.Task | None = None
+_lag_peak = 0.0
+
+
+async def _watch_loop_lag():
+    global _lag_peak
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, time.monotonic() - started - LOOP_LAG_INTERVAL)
+        loop_lag_seconds.observe(lag)
+        _lag_peak = max(_lag_peak, lag)
+
+
+@register_collector
+def _collect_loop_lag():
+    global _lag_peak
+    loop_lag_max.set(_lag_peak)
+    _lag_peak = 0.0
+    return []
+
+
+def start_loop_monitor():
+    global _lag_task
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(_watch_loop_lag())
+
+
+async def stop_loop_monitor():
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        await asyncio.gather(_lag_task, return_exceptions=True)
+        _lag_task = None
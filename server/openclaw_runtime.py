@@ -1,11 +1,23 @@
 import os
+import time
+import zlib
 import asyncio
 import logging
 import json
+import hashlib
 import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from datetime import datetime, timezone, timedelta
 
-import httpx
+from http_clients import get_client
+from caches import SingleFlight, invalidate_agent_context
+from batch_writer import write_behind
+from prompt_packer import estimate_tokens
+from groq_dispatcher import groq_dispatcher, BACKGROUND
+from llm_cache import llm_cache, cache_key
+from metrics import skill_seconds
+from leader import heartbeat_lease
 
 logger = logging.getLogger("openclaw")
 
@@ -15,13 +27,33 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 AGENT_ID = os.environ.get("GYEOL_AGENT_ID", "")
 HEARTBEAT_INTERVAL = int(os.environ.get("OPENCLAW_HEARTBEAT_INTERVAL", "1800"))
+# 0 turns off the background loop; POST /openclaw/heartbeat still runs a cycle on demand
+HEARTBEAT_ENABLED = os.environ.get("OPENCLAW_HEARTBEAT_ENABLED", "1") == "1"
+# Agents are split into shards by id hash; one shard runs per tick so each agent still gets one cycle per interval
+HEARTBEAT_SHARDS = max(1, int(os.environ.get("OPENCLAW_HEARTBEAT_SHARDS", "6")))
+HEARTBEAT_CONCURRENCY = int(os.environ.get("OPENCLAW_HEARTBEAT_CONCURRENCY", "8"))
+ACTIVE_AGENT_DAYS = int(os.environ.get("OPENCLAW_ACTIVE_AGENT_DAYS", "7"))
+MAX_HEARTBEAT_AGENTS = int(os.environ.get("OPENCLAW_MAX_AGENTS", "1000"))
+DEEP_ANALYSIS_INTERVAL = int(os.environ.get("OPENCLAW_DEEP_ANALYSIS_INTERVAL", "21600"))
+SUPABASE_CONCURRENCY = int(os.environ.get("OPENCLAW_SUPABASE_CONCURRENCY", "16"))
+RSS_CONCURRENCY = int(os.environ.get("OPENCLAW_RSS_CONCURRENCY", "4"))
 
 KST = timezone(timedelta(hours=9))
 
 _heartbeat_task = None
+# Cycle started from POST /openclaw/heartbeat, run in the background
+_manual_task = None
 _last_heartbeat = None
 _heartbeat_count = 0
-_last_deep_analysis = None
+_last_cycle = None
+# agent_id -> heartbeat counters, last deep analysis and per-skill timings
+_agent_state: dict[str, dict] = {}
+# Agents with a cycle in progress; a second cycle for the same agent is skipped, not run twice
+_agents_running: set[str] = set()
+
+# Per-upstream concurrency limits shared by every agent's skills
+_supabase_limit = asyncio.Semaphore(SUPABASE_CONCURRENCY)
+_rss_limit = asyncio.Semaphore(RSS_CONCURRENCY)
 
 
 async def _supabase_get(path: str, params: dict | None = None) -> list | dict | None:
@@ -32,79 +64,125 @@ async def _supabase_get(path: str, params: dict | None = None) -> list | dict |
         "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
         "Accept": "application/json",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(f"{SUPABASE_URL}/rest/v1/{path}", headers=headers, params=params or {})
-        if resp.status_code == 200:
-            return resp.json()
+    async with _supabase_limit:
+        resp = await get_client("supabase").get(f"{SUPABASE_URL}/rest/v1/{path}", headers=headers, params=params or {})
+    if resp.status_code == 200:
+        return resp.json()
     return None
 
 
-async def _supabase_post(path: str, body: dict | list) -> bool:
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-        return False
+def _supabase_headers(prefer: str | None = None) -> dict:
     headers = {
         "apikey": SUPABASE_SERVICE_KEY,
         "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
         "Content-Type": "application/json",
-        "Prefer": "return=minimal",
     }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(f"{SUPABASE_URL}/rest/v1/{path}", headers=headers, json=body)
-        return resp.status_code < 300
+    if prefer:
+        headers["Prefer"] = prefer
+    return headers
 
 
-async def _supabase_upsert(path: str, body: dict) -> bool:
+async def _supabase_send(path: str, body: dict | list, on_conflict: str | None = None, upsert: bool = False):
+    prefer = "resolution=merge-duplicates,return=minimal" if upsert else "return=minimal"
+    params = {"on_conflict": on_conflict} if on_conflict else {}
+    async with _supabase_limit:
+        return await get_client("supabase").post(
+            f"{SUPABASE_URL}/rest/v1/{path}", headers=_supabase_headers(prefer), params=params, json=body,
+        )
+
+
+async def _supabase_post(path: str, body: dict | list) -> bool:
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         return False
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates",
-    }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(f"{SUPABASE_URL}/rest/v1/{path}", headers=headers, json=body)
-        return resp.status_code < 300
+    resp = await _supabase_send(path, body)
+    return resp.status_code < 300
+
+
+async def _supabase_upsert(path: str, body: dict | list, on_conflict: str | None = None) -> bool:
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        return False
+    resp = await _supabase_send(path, body, on_conflict, upsert=True)
+    return resp.status_code < 300
+
+
+async def _send_rows(path: str, rows: list, on_conflict: str | None, upsert: bool) -> list:
+    resp = await _supabase_send(path, rows, on_conflict, upsert)
+    if resp.status_code < 300:
+        return []
+    # A 4xx on a multi-row array is usually one bad row; split until it's isolated.
+    # Server errors aren't row-specific, so the whole batch is reported instead.
+    if len(rows) == 1 or resp.status_code >= 500:
+        logger.warning(f"[supabase] {path}: {len(rows)} rows rejected: {resp.status_code} {resp.text[:200]}")
+        return [(row, resp.status_code) for row in rows]
+    mid = len(rows) // 2
+    return await _send_rows(path, rows[:mid], on_conflict, upsert) + await _send_rows(path, rows[mid:], on_conflict, upsert)
+
+
+async def _supabase_bulk_write(path: str, rows: list, on_conflict: str | None = None, upsert: bool = False) -> list:
+    """Insert (or upsert on `on_conflict`) rows with one request per key set.
+
+    Returns (row, status) for each row that could not be written (status 0 if nothing was sent),
+    so callers can tell a rejected row (4xx) from one worth retrying.
+    """
+    if not rows:
+        return []
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        return [(row, 0) for row in rows]
+    # PostgREST bulk inserts need every object in the array to share the same keys
+    groups: dict[frozenset, list] = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    failed = []
+    for group in groups.values():
+        failed.extend(await _send_rows(path, group, on_conflict, upsert))
+    return failed
 
 
 async def _supabase_patch(path: str, params: dict, body: dict) -> bool:
     if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
         return False
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-        "Content-Type": "application/json",
-    }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.patch(f"{SUPABASE_URL}/rest/v1/{path}", headers=headers, params=params, json=body)
-        return resp.status_code < 300
+    async with _supabase_limit:
+        resp = await get_client("supabase").patch(
+            f"{SUPABASE_URL}/rest/v1/{path}", headers=_supabase_headers(), params=params, json=body,
+        )
+    return resp.status_code < 300
 
 
-async def _groq_chat(system_prompt: str, user_message: str, max_tokens: int = 1024) -> str:
+async def _groq_chat(
+    system_prompt: str, user_message: str, max_tokens: int = 1024, json_mode: bool = False,
+    cache_ttl: float | None = None, site: str = "openclaw",
+) -> str:
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY not configured")
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json={
-                "model": GROQ_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message},
-                ],
-                "max_tokens": max_tokens,
-                "temperature": 0.7,
-            },
-        )
+    payload = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ],
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+        **({"response_format": {"type": "json_object"}} if json_mode else {}),
+    }
+    key = cache_key(payload) if cache_ttl else None
+    if key:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            return cached
+    # Heartbeat work yields to chat traffic and keeps clear of the interactive rate-limit reserve
+    resp = await groq_dispatcher.post(BACKGROUND, payload, timeout=30.0, site=site)
     if resp.status_code != 200:
         raise RuntimeError(f"Groq error {resp.status_code}: {resp.text[:200]}")
-    return resp.json()["choices"][0]["message"]["content"]
+    data = resp.json()
+    content = data["choices"][0]["message"]["content"]
+    if key:
+        await llm_cache.set(key, content, (data.get("usage") or {}).get("total_tokens", 0), cache_ttl)
+    return content
 
 
-async def _log_activity(activity_type: str, summary: str, details: dict | None = None) -> None:
+async def _log_activity(agent_id: str, activity_type: str, summary: str, details: dict | None = None) -> None:
     body = {
-        "agent_id": AGENT_ID,
+        "agent_id": agent_id,
         "activity_type": activity_type,
         "summary": summary,
         "was_sandboxed": True,
@@ -112,77 +190,392 @@ async def _log_activity(activity_type: str, summary: str, details: dict | None =
     }
     if details:
         body["details"] = details
-    await _supabase_post("gyeol_autonomous_logs", body)
+    write_behind.add("gyeol_autonomous_logs", body)
 
 
 RSS_FEEDS = [
     ("TechCrunch", "https://feeds.feedburner.com/TechCrunch"),
     ("Hacker News", "https://hnrss.org/frontpage?count=5"),
 ]
+# "Name|url,Name|url" replaces the default feed list
+if os.environ.get("OPENCLAW_RSS_FEEDS"):
+    RSS_FEEDS = [tuple(entry.split("|", 1)) for entry in os.environ["OPENCLAW_RSS_FEEDS"].split(",") if "|" in entry]
+LEARNER_ITEMS_PER_FEED = 3
+MAX_FEED_BYTES = int(os.environ.get("OPENCLAW_MAX_FEED_BYTES", str(2 * 1024 * 1024)))
+# A feed fetched this recently is reused as-is by every agent in the same tick
+FEED_FRESH_SECONDS = int(os.environ.get("OPENCLAW_FEED_FRESH_SECONDS", "300"))
+# Article summaries depend only on the title, so every agent learning the same article shares one
+TITLE_SUMMARY_TTL = float(os.environ.get("OPENCLAW_TITLE_SUMMARY_TTL", str(30 * 86400)))
+
+# feed_url -> {"etag", "last_modified", "items", "version", "fetched_at"}, shared by all agents
+_feed_state: dict[str, dict] = {}
+# (agent_id, feed_url) -> feed version the agent last learned from
+_agent_feed_versions: dict[tuple, str] = {}
+_feed_flight = SingleFlight()
+
+SEEN_INDEX_MAX_PER_AGENT = int(os.environ.get("OPENCLAW_SEEN_INDEX_SIZE", "2000"))
+# Optional JSON file that keeps the seen-item index across restarts without a Supabase read
+SEEN_INDEX_PATH = os.environ.get("OPENCLAW_SEEN_INDEX_PATH", "")
+# agent_id -> ordered set (oldest first) of normalized article URLs / GUIDs the agent already learned
+_seen_index: dict[str, OrderedDict] = {}
+# Set by _mark_seen; the index file is rewritten once at the end of a cycle, off the event loop
+_seen_dirty = False
+_seen_save_lock = asyncio.Lock()
+_seen_stats = {"loads": 0, "items_checked": 0, "items_skipped": 0}
+
+MEMORY_BATCH_TOKENS = int(os.environ.get("OPENCLAW_MEMORY_BATCH_TOKENS", "1500"))
+MEMORY_BATCH_MAX_MESSAGES = int(os.environ.get("OPENCLAW_MEMORY_BATCH_MAX_MESSAGES", "100"))
+# gyeol_user_memories.category CHECK constraint (same list as /memory add in main.py)
+MEMORY_CATEGORIES = (
+    "identity", "preference", "interest", "relationship", "goal", "emotion", "experience", "style", "knowledge_level",
+)
+# (agent_id, skill) -> last processed watermark, mirrored in gyeol_skill_cursors
+_skill_cursors: dict[tuple, str | None] = {}
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _feed_item(elem) -> tuple[str, str, str] | None:
+    title = link = guid = ""
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == "title" and not title:
+            title = (child.text or "").strip()
+        elif name == "link" and not link:
+            # RSS puts the URL in the text, Atom in href (skip rel="self"/"enclosure" etc.)
+            link = (child.text or "").strip() or (child.get("href", "") if child.get("rel", "alternate") == "alternate" else "")
+        elif name in ("guid", "id") and not guid:
+            guid = (child.text or "").strip()
+    return (title, link, guid) if title else None
+
+
+async def _read_feed_items(resp, limit: int) -> list[tuple[str, str, str]]:
+    """Pull-parse RSS <item> / Atom <entry> elements from a streamed body, stopping after `limit`.
+
+    Each item is cleared once read, reading stops at MAX_FEED_BYTES, and a parse error keeps
+    whatever items were already complete.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    items = []
+    received = 0
+    try:
+        async for chunk in resp.aiter_bytes():
+            received += len(chunk)
+            parser.feed(chunk)
+            for _, elem in parser.read_events():
+                if _local_name(elem.tag) not in ("item", "entry"):
+                    continue
+                item = _feed_item(elem)
+                elem.clear()
+                if item:
+                    items.append(item)
+                    if len(items) >= limit:
+                        return items
+            if received >= MAX_FEED_BYTES:
+                break
+    except ET.ParseError as e:
+        logger.warning(f"[skill:learner] Feed parse stopped after {len(items)} items: {e}")
+    return items
+
+
+async def _fetch_feed(feed_url: str) -> dict | None:
+    """Fetch a feed with ETag/If-Modified-Since, reusing the parsed items on 304."""
+    state = _feed_state.get(feed_url)
+    if state and time.monotonic() - state["fetched_at"] < FEED_FRESH_SECONDS:
+        return state
+    headers = {}
+    if state and state["etag"]:
+        headers["If-None-Match"] = state["etag"]
+    if state and state["last_modified"]:
+        headers["If-Modified-Since"] = state["last_modified"]
+    async with _rss_limit:
+        async with get_client("rss").stream("GET", feed_url, headers=headers) as resp:
+            if resp.status_code == 304 and state:
+                state["fetched_at"] = time.monotonic()
+                return state
+            if resp.status_code != 200:
+                return state
+            items = await _read_feed_items(resp, LEARNER_ITEMS_PER_FEED)
+    state = {
+        "etag": resp.headers.get("etag"),
+        "last_modified": resp.headers.get("last-modified"),
+        "items": items,
+        "version": hashlib.sha1("\n".join(f"{t}|{l}" for t, l, _ in items).encode()).hexdigest(),
+        "fetched_at": time.monotonic(),
+    }
+    _feed_state[feed_url] = state
+    return state
+
 
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
 
-async def _skill_learner() -> str:
+
+def _item_key(link: str, guid: str, title: str) -> str:
+    # Links are what gets persisted in gyeol_learned_topics.source_url, so they win over GUIDs
+    if link:
+        return _normalize_url(link)
+    if guid:
+        return f"guid:{guid}"
+    return f"title:{title.strip().lower()}"
+
+
+def _load_seen_file() -> dict:
+    if not SEEN_INDEX_PATH or not os.path.exists(SEEN_INDEX_PATH):
+        return {}
+    try:
+        with open(SEEN_INDEX_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[skill:learner] Seen index file unreadable: {e}")
+        return {}
+
+
+def _save_seen_file(snapshot: dict) -> bool:
+    tmp_path = f"{SEEN_INDEX_PATH}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, SEEN_INDEX_PATH)
+        return True
+    except OSError as e:
+        logger.warning(f"[skill:learner] Seen index save failed: {e}")
+        return False
+
+
+async def _flush_seen_index():
+    global _seen_dirty
+    if not SEEN_INDEX_PATH or not _seen_dirty:
+        return
+    async with _seen_save_lock:
+        if not _seen_dirty:
+            return
+        _seen_dirty = False
+        # Copy on the loop so the thread never sees the index mid-update
+        snapshot = {agent_id: list(keys) for agent_id, keys in _seen_index.items()}
+        if not await asyncio.to_thread(_save_seen_file, snapshot):
+            _seen_dirty = True
+
+
+async def _get_seen_index(agent_id: str) -> OrderedDict:
+    """Per-agent set of learned article keys, loaded once from the index file or Supabase."""
+    index = _seen_index.get(agent_id)
+    if index is not None:
+        return index
+    keys = (await asyncio.to_thread(_load_seen_file)).get(agent_id)
+    if keys is None:
+        rows = await _supabase_get("gyeol_learned_topics", {
+            "select": "title,source_url",
+            "agent_id": f"eq.{agent_id}",
+            "source": "eq.rss",
+            "order": "learned_at.desc",
+            "limit": str(SEEN_INDEX_MAX_PER_AGENT),
+        })
+        if not isinstance(rows, list):
+            # Supabase unavailable: don't pin an empty index, try loading again next cycle
+            return OrderedDict()
+        keys = [_item_key(r.get("source_url") or "", "", r.get("title") or "") for r in reversed(rows)]
+        _seen_stats["loads"] += 1
+    index = OrderedDict.fromkeys(keys)
+    _seen_index[agent_id] = index
+    return index
+
+
+def _mark_seen(agent_id: str, keys: list[str]):
+    global _seen_dirty
+    index = _seen_index.get(agent_id)
+    if index is None:
+        # Never loaded (Supabase was down); a partial index would stop history from loading later
+        return
+    for key in keys:
+        index[key] = None
+        index.move_to_end(key)
+    while len(index) > SEEN_INDEX_MAX_PER_AGENT:
+        index.popitem(last=False)
+    _seen_dirty = True
+
+
+async def _summarize_titles(items: list[tuple[str, str]]) -> list[str]:
+    """Summarize (feed_name, title) pairs, cached per title; misses share one Groq call.
+
+    Falls back to the title for any item the model didn't summarize.
+    """
+    keys = [cache_key(GROQ_MODEL, "rss-title-summary", feed_name, title) for feed_name, title in items]
+    cached = await asyncio.gather(*[llm_cache.get(key) for key in keys])
+    missing = [i for i, summary in enumerate(cached) if summary is None]
+    if missing:
+        fresh = await _summarize_uncached([items[i] for i in missing])
+        for i, summary in zip(missing, fresh):
+            if summary is not None:
+                feed_name, title = items[i]
+                tokens = estimate_tokens(f"[{feed_name}] {title}") + estimate_tokens(summary)
+                await llm_cache.set(keys[i], summary, tokens, TITLE_SUMMARY_TTL)
+            cached[i] = summary
+    return [summary or title for summary, (_, title) in zip(cached, items)]
+
+
+async def _summarize_uncached(items: list[tuple[str, str]]) -> list[str | None]:
+    numbered = "\n".join(f"{i}. [{feed_name}] {title}" for i, (feed_name, title) in enumerate(items, 1))
+    summaries: dict[int, str] = {}
+    try:
+        result = await _groq_chat(
+            """You are a Korean-speaking AI assistant. Summarize each numbered article title in 1 Korean sentence. Keep each concise and informative.
+Output ONLY valid JSON: {"summaries": [{"i": <article number>, "summary": "<Korean sentence>"}]}""",
+            f"Articles:\n{numbered}",
+            max_tokens=min(1500, 150 * len(items)),
+            json_mode=True,
+            site="learner",
+        )
+        start = result.find("{")
+        end = result.rfind("}") + 1
+        if start >= 0 and end > start:
+            for entry in json.loads(result[start:end]).get("summaries", []):
+                if isinstance(entry, dict) and entry.get("summary"):
+                    summaries[int(entry.get("i", 0))] = str(entry["summary"])
+    except Exception as e:
+        logger.warning(f"[skill:learner] Batch summary error: {e}")
+    return [summaries.get(i) for i in range(1, len(items) + 1)]
+
+
+async def _skill_learner(agent_id: str) -> str:
     logger.info("[skill:learner] Starting RSS learning")
+    states = await asyncio.gather(
+        *[_feed_flight.do(feed_url, lambda feed_url=feed_url: _fetch_feed(feed_url)) for _, feed_url in RSS_FEEDS],
+        return_exceptions=True,
+    )
+
+    new_items = []
+    fresh_versions = {}
+    unchanged = 0
+    for (feed_name, feed_url), state in zip(RSS_FEEDS, states):
+        if isinstance(state, BaseException):
+            logger.warning(f"[skill:learner] Feed {feed_name} error: {state}")
+            continue
+        if not state:
+            continue
+        if _agent_feed_versions.get((agent_id, feed_url)) == state["version"]:
+            unchanged += 1
+            continue
+        fresh_versions[(agent_id, feed_url)] = state["version"]
+        new_items.extend((feed_name, title, link, guid) for title, link, guid in state["items"])
+
+    # Drop articles this agent already learned before paying for any summary
+    seen = await _get_seen_index(agent_id)
+    candidates = len(new_items)
+    unseen = {}
+    for item in new_items:
+        key = _item_key(item[2], item[3], item[1])
+        if key not in seen and key not in unseen:
+            unseen[key] = item
+    new_items = list(unseen.values())
+    _seen_stats["items_checked"] += candidates
+    _seen_stats["items_skipped"] += candidates - len(new_items)
+
     topics_saved = 0
-    for feed_name, feed_url in RSS_FEEDS:
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(feed_url)
-            if resp.status_code != 200:
-                continue
-            root = ET.fromstring(resp.text[:50000])
-            items = root.findall(".//item")[:3]
-            if not items:
-                items = root.findall(".//{http://www.w3.org/2005/Atom}entry")[:3]
-            for item in items:
-                title_el = item.find("title")
-                if title_el is None:
-                    title_el = item.find("{http://www.w3.org/2005/Atom}title")
-                link_el = item.find("link")
-                if link_el is None:
-                    link_el = item.find("{http://www.w3.org/2005/Atom}link")
-                title = title_el.text if title_el is not None and title_el.text else ""
-                link = ""
-                if link_el is not None:
-                    link = link_el.text or link_el.get("href", "")
-                if not title:
-                    continue
-                try:
-                    summary = await _groq_chat(
-                        "You are a Korean-speaking AI assistant. Summarize the following article title in 1 Korean sentence. Keep it concise and informative. Output ONLY the summary, nothing else.",
-                        f"Article from {feed_name}: {title}",
-                        max_tokens=150,
-                    )
-                except Exception:
-                    summary = title
-                await _supabase_post("gyeol_learned_topics", {
-                    "agent_id": AGENT_ID,
-                    "title": title[:200],
-                    "summary": summary[:500],
-                    "source": "rss",
-                    "source_url": link[:500] if link else None,
-                })
-                topics_saved += 1
-        except Exception as e:
-            logger.warning(f"[skill:learner] Feed {feed_name} error: {e}")
-    await _log_activity("learning", f"RSS 학습 완료: {topics_saved}개 주제", {"source_count": topics_saved})
-    return f"learned {topics_saved} topics"
+    if new_items:
+        summaries = await _summarize_titles([(feed_name, title) for feed_name, title, _, _ in new_items])
+        rows = [{
+            "agent_id": agent_id,
+            "title": title[:200],
+            "summary": summary[:500],
+            "source": "rss",
+            "source_url": link[:500] if link else None,
+        } for (_, title, link, _), summary in zip(new_items, summaries)]
+        # Per row, so an article is only marked learned once its own insert went through
+        written = await asyncio.gather(*[write_behind.write("gyeol_learned_topics", row, durable=True) for row in rows])
+        saved_keys = [key for key, ok in zip(unseen, written) if ok]
+        topics_saved = len(saved_keys)
+        if saved_keys:
+            invalidate_agent_context(agent_id, "topics")
+            _mark_seen(agent_id, saved_keys)
+    if topics_saved == len(new_items):
+        # Otherwise leave the feed versions alone so the unsaved articles are offered again
+        _agent_feed_versions.update(fresh_versions)
+    skipped = candidates - len(new_items)
+    await _log_activity(agent_id, "learning", f"RSS 학습 완료: {topics_saved}개 주제", {
+        "source_count": topics_saved,
+        "unchanged_feeds": unchanged,
+        "already_learned": skipped,
+    })
+    return f"learned {topics_saved} topics ({unchanged} feeds unchanged, {skipped} already learned)"
 
 
-async def _skill_user_memory() -> str:
-    logger.info("[skill:user-memory] Starting memory extraction")
-    conversations = await _supabase_get("gyeol_conversations", {
-        "agent_id": f"eq.{AGENT_ID}",
-        "role": "eq.user",
-        "order": "created_at.desc",
-        "limit": "20",
-        "select": "content",
+async def _get_cursor(agent_id: str, skill: str) -> str | None:
+    key = (agent_id, skill)
+    if key in _skill_cursors:
+        return _skill_cursors[key]
+    rows = await _supabase_get("gyeol_skill_cursors", {
+        "select": "cursor",
+        "agent_id": f"eq.{agent_id}",
+        "skill": f"eq.{skill}",
     })
-    if not conversations or not isinstance(conversations, list) or len(conversations) == 0:
-        return "no conversations to analyze"
+    if not isinstance(rows, list):
+        return None
+    value = rows[0].get("cursor") if rows else None
+    _skill_cursors[key] = value
+    return value
 
-    user_msgs = "\n".join([c.get("content", "") for c in conversations if c.get("content")])
+
+async def _set_cursor(agent_id: str, skill: str, value: str | None):
+    if not value or _skill_cursors.get((agent_id, skill)) == value:
+        return
+    _skill_cursors[(agent_id, skill)] = value
+    await _supabase_upsert("gyeol_skill_cursors", {
+        "agent_id": agent_id,
+        "skill": skill,
+        "cursor": value,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="agent_id,skill")
+
+
+async def _skill_user_memory(agent_id: str) -> str:
+    logger.info("[skill:user-memory] Starting memory extraction")
+    cursor = await _get_cursor(agent_id, "user_memory")
+    if cursor:
+        # Only messages after the last processed one, oldest first. Keyset on "created_at|id":
+        # write-behind inserts a whole batch with one now(), so created_at alone isn't unique.
+        created_at, _, row_id = cursor.partition("|")
+        conversations = await _supabase_get("gyeol_conversations", {
+            "agent_id": f"eq.{agent_id}",
+            "role": "eq.user",
+            "or": f'(created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}"))',
+            "order": "created_at.asc,id.asc",
+            "limit": str(MEMORY_BATCH_MAX_MESSAGES),
+            "select": "id,content,created_at",
+        })
+    else:
+        # First run for this agent: start from the recent history, like before cursors existed
+        conversations = await _supabase_get("gyeol_conversations", {
+            "agent_id": f"eq.{agent_id}",
+            "role": "eq.user",
+            "order": "created_at.desc,id.desc",
+            "limit": "20",
+            "select": "id,content,created_at",
+        })
+        if isinstance(conversations, list):
+            conversations.reverse()
+    if not conversations or not isinstance(conversations, list) or len(conversations) == 0:
+        return "no new messages" if cursor else "no conversations to analyze"
+
+    # Take messages up to the token budget; the rest wait for the next cycle
+    batch = []
+    used = 0
+    for c in conversations:
+        cost = estimate_tokens(c.get("content") or "")
+        if batch and used + cost > MEMORY_BATCH_TOKENS:
+            break
+        batch.append(c)
+        used += cost
+    last = batch[-1]
+    new_cursor = f"{last['created_at']}|{last['id']}" if last.get("created_at") and last.get("id") else cursor
+
+    user_msgs = "\n".join([c.get("content", "") for c in batch if c.get("content")])
     if not user_msgs.strip():
+        await _set_cursor(agent_id, "user_memory", new_cursor)
         return "no user messages found"
 
     try:
@@ -194,8 +587,9 @@ Rules:
 - Max 5 items per analysis
 - confidence 90-100 for explicit statements, 50-70 for inferences
 - Output ONLY the JSON array, no explanation""",
-            f"User messages:\n{user_msgs[:3000]}",
+            f"User messages:\n{user_msgs}",
             max_tokens=500,
+            site="user_memory",
         )
     except Exception as e:
         logger.warning(f"[skill:user-memory] Groq error: {e}")
@@ -204,38 +598,54 @@ Rules:
     try:
         start = result.find("[")
         end = result.rfind("]") + 1
-        if start >= 0 and end > start:
-            memories = json.loads(result[start:end])
-        else:
-            return "no valid JSON in response"
+        memories = json.loads(result[start:end]) if start >= 0 and end > start else None
     except json.JSONDecodeError:
-        return "JSON parse error"
-
-    saved = 0
+        memories = None
+    if not isinstance(memories, list):
+        # Re-sending the same batch is unlikely to do better; don't pay for it every cycle
+        await _set_cursor(agent_id, "user_memory", new_cursor)
+        return "no valid JSON in response"
+
+    # Keyed like the unique constraint: one upsert can't touch the same (agent_id, category, key) row twice.
+    # Items the table would always reject are skipped here, so they can't pin the cursor.
+    rows = {}
     for mem in memories[:5]:
-        cat = mem.get("category", "")
-        key = mem.get("key", "")
-        val = mem.get("value", "")
-        conf = mem.get("confidence", 50)
-        if not cat or not key or not val:
+        if not isinstance(mem, dict):
             continue
-        await _supabase_upsert("gyeol_user_memories", {
-            "agent_id": AGENT_ID,
+        cat = str(mem.get("category") or "").strip().lower()
+        key = str(mem.get("key") or "").strip()
+        val = str(mem.get("value") or "").strip()
+        if cat not in MEMORY_CATEGORIES or not key or not val:
+            continue
+        try:
+            conf = int(float(mem.get("confidence", 50)))
+        except (TypeError, ValueError):
+            conf = 50
+        rows[(cat, key)] = {
+            "agent_id": agent_id,
             "category": cat,
             "key": key,
             "value": val,
-            "confidence": min(100, max(0, int(conf))),
-        })
-        saved += 1
-
-    await _log_activity("learning", f"사용자 기억 {saved}개 추출", {"memories_extracted": saved})
+            "confidence": min(100, max(0, conf)),
+        }
+    failed = await _supabase_bulk_write("gyeol_user_memories", list(rows.values()), on_conflict="agent_id,category,key", upsert=True)
+    if failed:
+        logger.warning(f"[skill:user-memory] {len(failed)} memories not saved: {[(row['key'], status) for row, status in failed]}")
+    # A rejected row (4xx) fails the same way every time; only hold the cursor for server/network errors
+    if not any(status in (0, 408, 429) or status >= 500 for _, status in failed):
+        await _set_cursor(agent_id, "user_memory", new_cursor)
+    saved = len(rows) - len(failed)
+
+    if saved:
+        invalidate_agent_context(agent_id, "memories")
+    await _log_activity(agent_id, "learning", f"사용자 기억 {saved}개 추출", {"memories_extracted": saved})
     return f"extracted {saved} memories"
 
 
-async def _skill_personality_evolve() -> str:
+async def _skill_personality_evolve(agent_id: str) -> str:
     logger.info("[skill:personality-evolve] Starting deep analysis")
     conversations = await _supabase_get("gyeol_conversations", {
-        "agent_id": f"eq.{AGENT_ID}",
+        "agent_id": f"eq.{agent_id}",
         "order": "created_at.desc",
         "limit": "30",
         "select": "role,content",
@@ -260,6 +670,7 @@ async def _skill_personality_evolve() -> str:
 IMPORTANT: personality_delta must NOT be all zeros. Every conversation causes some change.""",
             f"Conversation:\n{conv_text[:4000]}",
             max_tokens=600,
+            site="personality",
         )
     except Exception as e:
         logger.warning(f"[skill:personality-evolve] Groq error: {e}")
@@ -276,7 +687,7 @@ IMPORTANT: personality_delta must NOT be all zeros. Every conversation causes so
         return "JSON parse error"
 
     await _supabase_post("gyeol_conversation_insights", {
-        "agent_id": AGENT_ID,
+        "agent_id": agent_id,
         "topics": analysis.get("topics", []),
         "emotion_arc": analysis.get("emotion_arc", "neutral"),
         "underlying_need": analysis.get("underlying_need", ""),
@@ -289,7 +700,7 @@ IMPORTANT: personality_delta must NOT be all zeros. Every conversation causes so
     delta = analysis.get("personality_delta", {})
     if any(v != 0 for v in delta.values()):
         agent = await _supabase_get("gyeol_agents", {
-            "id": f"eq.{AGENT_ID}",
+            "id": f"eq.{agent_id}",
             "select": "warmth,logic,creativity,energy,humor",
         })
         if agent and isinstance(agent, list) and len(agent) > 0:
@@ -301,9 +712,10 @@ IMPORTANT: personality_delta must NOT be all zeros. Every conversation causes so
                     new_val = max(0, min(100, current.get(trait, 50) + int(d)))
                     update[trait] = new_val
             if update:
-                await _supabase_patch("gyeol_agents", {"id": f"eq.{AGENT_ID}"}, update)
+                await _supabase_patch("gyeol_agents", {"id": f"eq.{agent_id}"}, update)
+    invalidate_agent_context(agent_id, "insight", "agent")
 
-    await _log_activity("reflection", "대화 심층 분석 + 성격 진화", {"delta": delta, "topics": analysis.get("topics", [])})
+    await _log_activity(agent_id, "reflection", "대화 심층 분석 + 성격 진화", {"delta": delta, "topics": analysis.get("topics", [])})
     return f"analyzed, delta={delta}"
 
 
@@ -312,86 +724,211 @@ async def _is_night_kst() -> bool:
     return now_kst.hour >= 23 or now_kst.hour < 7
 
 
-async def run_heartbeat_cycle() -> dict:
-    global _last_heartbeat, _heartbeat_count, _last_deep_analysis
+def _shard_of(agent_id: str) -> int:
+    return zlib.crc32(agent_id.encode()) % HEARTBEAT_SHARDS
+
+
+async def _active_agent_ids() -> list[str]:
+    if AGENT_ID:
+        return [AGENT_ID]
+    since = (datetime.now(timezone.utc) - timedelta(days=ACTIVE_AGENT_DAYS)).isoformat()
+    rows = await _supabase_get("gyeol_agents", {
+        "select": "id",
+        "last_active": f"gte.{since}",
+        "order": "last_active.desc",
+        "limit": str(MAX_HEARTBEAT_AGENTS),
+    })
+    if not rows or not isinstance(rows, list):
+        return []
+    return [r["id"] for r in rows if r.get("id")]
+
+
+async def _timed_skill(name: str, skill, agent_id: str, timings: dict) -> str:
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        return await skill(agent_id)
+    except Exception as e:
+        status = "error"
+        logger.error(f"[heartbeat] {name} failed for {agent_id}: {e}")
+        return f"error: {e}"
+    finally:
+        elapsed = time.perf_counter() - started
+        timings[name] = round(elapsed * 1000, 1)
+        skill_seconds.observe(elapsed, skill=name, status=status)
+
+
+async def _run_agent_cycle(agent_id: str) -> dict:
+    if agent_id in _agents_running:
+        return {"skipped": "cycle already running"}
+    _agents_running.add(agent_id)
+    try:
+        return await _run_agent_skills(agent_id)
+    finally:
+        _agents_running.discard(agent_id)
+
+
+async def _run_agent_skills(agent_id: str) -> dict:
+    state = _agent_state.setdefault(agent_id, {
+        "heartbeat_count": 0,
+        "last_heartbeat": None,
+        "last_deep_analysis": None,
+    })
+    timings: dict = {}
+    started = time.perf_counter()
+
+    # user memory and learner touch different tables, so they run side by side
+    user_memory, learner = await asyncio.gather(
+        _timed_skill("user_memory", _skill_user_memory, agent_id, timings),
+        _timed_skill("learner", _skill_learner, agent_id, timings),
+    )
+    results = {"user_memory": user_memory, "learner": learner}
+
+    last_deep = state["last_deep_analysis"]
+    if last_deep is None or (datetime.now(timezone.utc) - last_deep).total_seconds() >= DEEP_ANALYSIS_INTERVAL:
+        results["personality_evolve"] = await _timed_skill("personality_evolve", _skill_personality_evolve, agent_id, timings)
+        if not results["personality_evolve"].startswith("error"):
+            state["last_deep_analysis"] = datetime.now(timezone.utc)
+
+    state["heartbeat_count"] += 1
+    state["last_heartbeat"] = datetime.now(timezone.utc).isoformat()
+    state["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    state["skill_ms"] = timings
+    return results
+
+
+async def run_heartbeat_cycle(shard: int | None = None) -> dict:
+    """Run skills for every active agent, or only those in `shard` when called from the loop."""
+    global _last_heartbeat, _heartbeat_count, _last_cycle
     results = {}
 
     if await _is_night_kst():
         results["skipped"] = "night time (KST 23:00-07:00)"
         return results
 
-    try:
-        results["user_memory"] = await _skill_user_memory()
-    except Exception as e:
-        results["user_memory"] = f"error: {e}"
-        logger.error(f"[heartbeat] user_memory failed: {e}")
+    agent_ids = await _active_agent_ids()
+    if shard is not None:
+        agent_ids = [a for a in agent_ids if _shard_of(a) == shard]
 
-    try:
-        results["learner"] = await _skill_learner()
-    except Exception as e:
-        results["learner"] = f"error: {e}"
-        logger.error(f"[heartbeat] learner failed: {e}")
+    started = time.perf_counter()
+    limit = asyncio.Semaphore(HEARTBEAT_CONCURRENCY)
 
-    should_deep = False
-    if _last_deep_analysis is None:
-        should_deep = True
-    else:
-        elapsed = (datetime.now(timezone.utc) - _last_deep_analysis).total_seconds()
-        if elapsed >= 21600:
-            should_deep = True
+    async def _run(agent_id: str):
+        async with limit:
+            return agent_id, await _run_agent_cycle(agent_id)
 
-    if should_deep:
-        try:
-            results["personality_evolve"] = await _skill_personality_evolve()
-            _last_deep_analysis = datetime.now(timezone.utc)
-        except Exception as e:
-            results["personality_evolve"] = f"error: {e}"
-            logger.error(f"[heartbeat] personality_evolve failed: {e}")
+    agents = {}
+    for agent_id, agent_results in await asyncio.gather(*[_run(a) for a in agent_ids]):
+        agents[agent_id] = agent_results
+    results["agents"] = agents
+    await _flush_seen_index()
 
     _last_heartbeat = datetime.now(timezone.utc).isoformat()
     _heartbeat_count += 1
-    logger.info(f"[heartbeat] Cycle #{_heartbeat_count} complete: {results}")
+    _last_cycle = {
+        "shard": shard,
+        "agents": len(agent_ids),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(f"[heartbeat] Cycle #{_heartbeat_count} (shard={shard}) complete for {len(agent_ids)} agents: {results}")
     return results
 
 
 async def _heartbeat_loop():
     await asyncio.sleep(10)
-    logger.info(f"[openclaw] Heartbeat started (interval={HEARTBEAT_INTERVAL}s)")
+    tick = HEARTBEAT_INTERVAL / HEARTBEAT_SHARDS
+    logger.info(f"[openclaw] Heartbeat started (interval={HEARTBEAT_INTERVAL}s, shards={HEARTBEAT_SHARDS})")
+    shard = 0
     while True:
+        if not heartbeat_lease.is_leader:
+            # Poll often enough to take over soon after the leader's lease lapses
+            await asyncio.sleep(min(tick, heartbeat_lease.ttl / 3))
+            continue
         try:
-            await run_heartbeat_cycle()
+            await run_heartbeat_cycle(shard)
         except Exception as e:
             logger.error(f"[heartbeat] Cycle error: {e}")
-        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        shard = (shard + 1) % HEARTBEAT_SHARDS
+        await asyncio.sleep(tick)
+
+
+async def _run_manual_cycle(shard: int | None):
+    try:
+        await run_heartbeat_cycle(shard)
+    except Exception as e:
+        logger.error(f"[heartbeat] Manual cycle error: {e}")
+
+
+def trigger_heartbeat_cycle(shard: int | None = None) -> bool:
+    """Start a cycle in the background; returns False if a manually triggered one is still running."""
+    global _manual_task
+    if _manual_task is not None and not _manual_task.done():
+        return False
+    _manual_task = asyncio.create_task(_run_manual_cycle(shard))
+    return True
 
 
 def start_heartbeat():
     global _heartbeat_task
-    if not AGENT_ID:
-        logger.warning("[openclaw] GYEOL_AGENT_ID not set, heartbeat disabled")
+    if not AGENT_ID and not (SUPABASE_URL and SUPABASE_SERVICE_KEY):
+        logger.warning("[openclaw] Neither GYEOL_AGENT_ID nor Supabase configured, heartbeat disabled")
         return
     if not GROQ_API_KEY:
         logger.warning("[openclaw] GROQ_API_KEY not set, heartbeat disabled")
         return
+    # Elected even with the loop off: manually triggered cycles only run on the leader too
+    heartbeat_lease.start(_shared_state)
+    if not HEARTBEAT_ENABLED:
+        logger.info("[openclaw] OPENCLAW_HEARTBEAT_ENABLED=0, background heartbeat disabled")
+        return
     _heartbeat_task = asyncio.create_task(_heartbeat_loop())
     logger.info("[openclaw] Heartbeat task created")
 
 
-def stop_heartbeat():
+async def stop_heartbeat():
     global _heartbeat_task
     if _heartbeat_task:
         _heartbeat_task.cancel()
         _heartbeat_task = None
+    await _flush_seen_index()
+    await heartbeat_lease.stop()
+
+
+def _shared_state() -> dict:
+    """What the heartbeat leader publishes with its lease for other processes to report."""
+    return {
+        "heartbeat_count": _heartbeat_count,
+        "last_heartbeat": _last_heartbeat,
+        "last_cycle": _last_cycle,
+        "agents": len(_agent_state),
+    }
 
 
 def get_status() -> dict:
     return {
         "runtime": "openclaw-lite",
-        "agent_id": AGENT_ID or "not set",
+        "agent_id": AGENT_ID or "all active agents",
         "heartbeat_interval": HEARTBEAT_INTERVAL,
+        "heartbeat_shards": HEARTBEAT_SHARDS,
+        "heartbeat_concurrency": HEARTBEAT_CONCURRENCY,
         "heartbeat_count": _heartbeat_count,
         "last_heartbeat": _last_heartbeat,
-        "last_deep_analysis": _last_deep_analysis.isoformat() if _last_deep_analysis else None,
+        "last_cycle": _last_cycle,
+        "manual_cycle_running": _manual_task is not None and not _manual_task.done(),
+        "agents_running": len(_agents_running),
+        "leader": heartbeat_lease.status(),
+        "agents": {
+            agent_id: {
+                **state,
+                "last_deep_analysis": state["last_deep_analysis"].isoformat() if state["last_deep_analysis"] else None,
+            }
+            for agent_id, state in _agent_state.items()
+        },
+        "learner_dedup": {
+            **_seen_stats,
+            "hit_rate": round(_seen_stats["items_skipped"] / _seen_stats["items_checked"], 3) if _seen_stats["items_checked"] else 0.0,
+            "agents_indexed": len(_seen_index),
+        },
         "groq_model": GROQ_MODEL,
         "supabase_connected": bool(SUPABASE_URL and SUPABASE_SERVICE_KEY),
     }
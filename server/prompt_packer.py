@@ -0,0 +1,129 @@
+import os
+import re
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("GYEOL_PROMPT_TOKEN_BUDGET", "3500"))
+
+# Per-section token caps and packing priority (lower packs first); required sections are never cut
+SECTION_BUDGETS = {
+    "search": int(os.environ.get("GYEOL_PROMPT_SEARCH_TOKENS", "800")),
+    "history": int(os.environ.get("GYEOL_PROMPT_HISTORY_TOKENS", "1500")),
+    "memories": int(os.environ.get("GYEOL_PROMPT_MEMORY_TOKENS", "300")),
+    "insight": int(os.environ.get("GYEOL_PROMPT_INSIGHT_TOKENS", "80")),
+    "topics": int(os.environ.get("GYEOL_PROMPT_TOPIC_TOKENS", "300")),
+}
+SECTION_PRIORITY = {"search": 1, "history": 2, "memories": 3, "insight": 4, "topics": 5}
+
+# Per-message framing overhead in the chat-completions format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Hangul syllables/jamo are roughly one token each, ASCII words about four characters per token
+_TOKEN_PIECES = re.compile(r"[가-힣ㄱ-ㆎ]|[A-Za-z0-9]+|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    tokens = 0
+    for match in _TOKEN_PIECES.finditer(text):
+        piece = match.group()
+        if len(piece) > 1:
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + "…" if lo else ""
+
+
+def section(name: str, items: list, header: str = "", footer: str = "", required: bool = False) -> dict:
+    return {"name": name, "items": items, "header": header, "footer": footer, "required": required}
+
+
+def _item_tokens(item) -> int:
+    if isinstance(item, dict):
+        return estimate_tokens(item.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+    return estimate_tokens(item)
+
+
+def _render(sec: dict, items: list) -> str:
+    return sec["header"] + "\n".join(items) + sec["footer"]
+
+
+def pack_prompt(sections: list, history: list, budget: int = PROMPT_TOKEN_BUDGET) -> dict:
+    """Fit system prompt sections and chat history into a token budget.
+
+    Sections are rendered in the order given; budget is handed out by SECTION_PRIORITY. Items are
+    kept in order until the section's cap is hit, so the same inputs always pack the same way.
+    `history` is chronological; the newest messages are kept first.
+    """
+    history_sec = section("history", list(reversed(history)))
+    remaining = budget
+    kept: dict = {}
+    usage: dict = {}
+
+    ordered = sorted(
+        sections + [history_sec],
+        key=lambda s: (not s["required"], SECTION_PRIORITY.get(s["name"], 99)),
+    )
+    for sec in ordered:
+        items = sec["items"]
+        overhead = estimate_tokens(sec["header"] + sec["footer"])
+        if sec["required"]:
+            cap = None
+        else:
+            cap = min(SECTION_BUDGETS.get(sec["name"], remaining), remaining) - overhead
+        chosen = []
+        used = 0
+        truncated = False
+        for item in items:
+            cost = _item_tokens(item)
+            if cap is None or used + cost <= cap:
+                chosen.append(item)
+                used += cost
+                continue
+            # A single oversized first item is cut to fit rather than dropping the whole section
+            if not chosen:
+                if isinstance(item, dict):
+                    cut = truncate_to_tokens(item.get("content", ""), cap - MESSAGE_OVERHEAD_TOKENS)
+                    if cut:
+                        chosen.append({**item, "content": cut})
+                else:
+                    cut = truncate_to_tokens(item, cap)
+                    if cut:
+                        chosen.append(cut)
+                if chosen:
+                    used = _item_tokens(chosen[0])
+                    truncated = True
+            break
+        if chosen and sec is not history_sec:
+            used += overhead
+        remaining = max(0, remaining - used)
+        kept[sec["name"]] = chosen
+        usage[sec["name"]] = {
+            "tokens": used,
+            "budget": None if sec["required"] else SECTION_BUDGETS.get(sec["name"]),
+            "items": len(chosen),
+            "dropped": len(items) - len(chosen),
+            "truncated": truncated,
+        }
+
+    system = "\n\n".join(_render(sec, kept[sec["name"]]) for sec in sections if kept[sec["name"]])
+    total = sum(u["tokens"] for u in usage.values())
+    return {
+        "system": system,
+        "history": list(reversed(kept["history"])),
+        "usage": usage,
+        "total_tokens": total,
+        "budget": budget,
+    }
@@ -0,0 +1,115 @@
+import os
+import re
+import logging
+
+from caches import TTLCache
+
+logger = logging.getLogger("gyeol")
+
+ROUTE_CACHE_SIZE = int(os.environ.get("GYEOL_ROUTE_CACHE_SIZE", "5000"))
+ROUTE_CACHE_TTL = float(os.environ.get("GYEOL_ROUTE_CACHE_TTL", "86400"))
+# Local score at or above which we search without asking the LLM, and at or below which we skip search
+ROUTE_YES_SCORE = float(os.environ.get("GYEOL_ROUTE_YES_SCORE", "3.0"))
+ROUTE_NO_SCORE = float(os.environ.get("GYEOL_ROUTE_NO_SCORE", "0.5"))
+
+SEARCH_TRIGGERS = re.compile(
+    r"날씨|뉴스|최신|현재|오늘|어제|속보|주가|환율|검색|최근|실시간|지금|트렌드|업데이트"
+)
+
+# Keyword weights for the local scorer: topics that only make sense with fresh data score high,
+# bare time words score low, and small-talk markers pull the score down
+KEYWORD_WEIGHTS = [
+    (re.compile(r"날씨|기온|미세먼지|강수|태풍"), 2.5),
+    (re.compile(r"뉴스|속보|기사|발표|사건"), 2.5),
+    (re.compile(r"주가|환율|시세|코스피|나스닥|비트코인|금리"), 2.5),
+    (re.compile(r"실시간|트렌드|검색|찾아\s?줘|찾아\s?봐"), 2.0),
+    (re.compile(r"경기\s?결과|스코어|순위|개봉|출시일|일정"), 1.5),
+    (re.compile(r"최신|최근|업데이트"), 1.0),
+    (re.compile(r"오늘|어제|현재|지금|요즘|이번\s?주"), 0.5),
+    (re.compile(r"알려\s?줘|뭐야|얼마|언제|어디|어때|\?"), 0.5),
+    (re.compile(r"기분|느낌|마음|생각|사랑|보고\s?싶|심심|외로|피곤|졸려|배고"), -2.0),
+    (re.compile(r"뭐\s?해|잘\s?자|고마워|미안|ㅋㅋ|ㅎㅎ|너는|넌|우리"), -1.5),
+]
+
+_QUERY_SUFFIX = re.compile(r"(\s*(좀|를|을|에\s?대해)?\s*(알려\s?줘요?|찾아\s?줘요?|검색해\s?줘요?|어때요?|궁금해요?|뭐야|\?|!|\.)\s*)+$")
+_NORMALIZE = re.compile(r"[\s\?\!\.,~]+")
+
+LLM_ROUTER_SYSTEM = "You are a search router. Determine if a user message requires web search for up-to-date info. Respond ONLY with 'YES: <search query>' or 'NO'. Nothing else."
+
+_route_cache = TTLCache(ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL)
+_stats = {
+    "messages": 0,
+    "not_triggered": 0,
+    "cache_hits": 0,
+    "local_yes": 0,
+    "local_no": 0,
+    "llm_calls": 0,
+    "llm_yes": 0,
+    "llm_errors": 0,
+}
+
+
+def normalize_message(text: str) -> str:
+    return _NORMALIZE.sub(" ", text.lower()).strip()
+
+
+def score_message(text: str) -> float:
+    return sum(weight for pattern, weight in KEYWORD_WEIGHTS if pattern.search(text))
+
+
+def local_query(text: str) -> str:
+    return _QUERY_SUFFIX.sub("", text.strip())[:100].strip() or text.strip()[:100]
+
+
+async def route_search(text: str, llm) -> str | None:
+    """Return a web search query if the message needs fresh information, otherwise None.
+
+    `llm(prompt, system_prompt)` is only awaited for messages the local scorer can't settle.
+    """
+    _stats["messages"] += 1
+    if not SEARCH_TRIGGERS.search(text):
+        _stats["not_triggered"] += 1
+        return None
+
+    key = normalize_message(text)
+    cached = _route_cache.get(key)
+    if cached is not None:
+        _stats["cache_hits"] += 1
+        return cached or None
+
+    score = score_message(text)
+    if score >= ROUTE_YES_SCORE:
+        _stats["local_yes"] += 1
+        query = local_query(text)
+    elif score <= ROUTE_NO_SCORE:
+        _stats["local_no"] += 1
+        query = ""
+    else:
+        _stats["llm_calls"] += 1
+        try:
+            answer = await llm(
+                f"사용자 메시지: {text}\n\n이 메시지에 답하려면 최신 정보나 웹검색이 필요한가요? YES와 검색 키워드를 반환하세요.\n형식: YES: <검색키워드> 또는 NO",
+                LLM_ROUTER_SYSTEM,
+            )
+        except Exception as e:
+            # Don't cache failures; the next identical message gets another chance
+            _stats["llm_errors"] += 1
+            logger.warning(f"Search router LLM error: {e}")
+            return None
+        query = ""
+        if answer and answer.strip().upper().startswith("YES:"):
+            query = answer.strip()[4:].strip()
+            if query:
+                _stats["llm_yes"] += 1
+
+    _route_cache.set(key, query)
+    return query or None
+
+
+def get_routing_stats() -> dict:
+    triggered = _stats["messages"] - _stats["not_triggered"]
+    return {
+        **_stats,
+        "llm_calls_saved": triggered - _stats["llm_calls"],
+        "cache": _route_cache.stats(),
+    }
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+from functools import partial
+
+from caches import TTLCache
+from batch_writer import BatchWriter, _post_rows
+
+logger = logging.getLogger("gyeol")
+
+LIKE_FLUSH_INTERVAL = float(os.environ.get("GYEOL_LIKE_FLUSH_INTERVAL", "1.0"))
+LIKE_DEDUP_SIZE = int(os.environ.get("GYEOL_LIKE_DEDUP_SIZE", "100000"))
+LIKE_DEDUP_TTL = float(os.environ.get("GYEOL_LIKE_DEDUP_TTL", "86400"))
+# How long an applied delta keeps being merged into reads that may predate it
+APPLIED_DELTA_TTL = float(os.environ.get("GYEOL_APPLIED_DELTA_TTL", "30"))
+
+COUNT_FIELDS = ("likes", "comments_count")
+
+
+class SocialCounters:
+    """Idempotent, batched likes plus a delta overlay so feed counts don't lag behind writes.
+
+    The DB triggers on gyeol_moltbook_likes/comments keep the post counters; rows are the deltas.
+    Likes are de-duplicated per (post, agent) and inserted in bulk on a timer, ignoring rows that
+    already exist. Until a read is fetched after a delta reached the database, `merge` adds it in.
+    """
+
+    def __init__(self, writer: BatchWriter):
+        self.writer = writer
+        self._liked = TTLCache(LIKE_DEDUP_SIZE, LIKE_DEDUP_TTL)
+        # post_id -> field -> count not yet written
+        self._pending: dict[str, dict[str, int]] = {}
+        # (applied_at, post_id, field, count) written to the database recently
+        self._applied: list[tuple] = []
+        self.likes_accepted = 0
+        self.likes_duplicate = 0
+        self.likes_failed = 0
+
+    def _add_pending(self, post_id: str, field: str, count: int):
+        fields = self._pending.setdefault(post_id, {})
+        fields[field] = fields.get(field, 0) + count
+        if not fields[field]:
+            del fields[field]
+        if not fields:
+            del self._pending[post_id]
+
+    def _applied_now(self, post_id: str, field: str, count: int = 1):
+        now = time.time()
+        self._applied.append((now, post_id, field, count))
+        cutoff = now - APPLIED_DELTA_TTL
+        if self._applied[0][0] < cutoff:
+            self._applied = [entry for entry in self._applied if entry[0] >= cutoff]
+
+    def like(self, post_id: str, agent_id: str) -> bool:
+        """Queue a like; returns False if this agent already liked the post."""
+        key = (post_id, agent_id)
+        if self._liked.get(key):
+            self.likes_duplicate += 1
+            return False
+        self._liked.set(key, True)
+        self.likes_accepted += 1
+        self._add_pending(post_id, "likes", 1)
+        future = self.writer.add("gyeol_moltbook_likes", {"post_id": post_id, "agent_id": agent_id})
+        future.add_done_callback(lambda f: self._like_done(post_id, agent_id, f.result()))
+        return True
+
+    def _like_done(self, post_id: str, agent_id: str, ok: bool):
+        self._add_pending(post_id, "likes", -1)
+        if ok:
+            self._applied_now(post_id, "likes")
+        else:
+            # Let the agent try again rather than silently losing the like
+            self.likes_failed += 1
+            self._liked.pop((post_id, agent_id))
+
+    def comment_added(self, post_id: str):
+        self._applied_now(post_id, "comments_count")
+
+    def merge(self, rows: list[dict], fetched_at: float) -> list[dict]:
+        """Return rows with pending deltas, and deltas applied after `fetched_at`, added to their counts."""
+        if not self._pending and not self._applied:
+            return rows
+        deltas: dict[str, dict[str, int]] = {}
+        for post_id, fields in self._pending.items():
+            deltas[post_id] = dict(fields)
+        for applied_at, post_id, field, count in self._applied:
+            if applied_at > fetched_at:
+                fields = deltas.setdefault(post_id, {})
+                fields[field] = fields.get(field, 0) + count
+        if not deltas:
+            return rows
+        merged = []
+        for row in rows:
+            fields = deltas.get(str(row.get("id")))
+            if fields:
+                row = {**row, **{f: (row.get(f) or 0) + n for f, n in fields.items() if f in COUNT_FIELDS}}
+            merged.append(row)
+        return merged
+
+    def stats(self) -> dict:
+        return {
+            "likes_accepted": self.likes_accepted,
+            "likes_duplicate": self.likes_duplicate,
+            "likes_failed": self.likes_failed,
+            "pending_posts": len(self._pending),
+            "recent_applied": len(self._applied),
+            "dedup": self._liked.stats(),
+            "writer": self.writer.stats(),
+        }
+
+
+like_writer = BatchWriter(
+    partial(_post_rows, prefer="resolution=ignore-duplicates,return=minimal", on_conflict="agent_id,post_id"),
+    max_batch=500,
+    flush_interval=LIKE_FLUSH_INTERVAL,
+    max_buffer=20000,
+    max_retries=5,
+)
+social_counters = SocialCounters(like_writer)
@@ -0,0 +1,120 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger("gyeol")
+
+
+class KeyedWorkQueue:
+    """Bounded async worker pool: items sharing a key run in order, different keys run in parallel."""
+
+    def __init__(self, name: str, handler, workers: int, max_pending: int, max_per_key: int):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_key = max_per_key
+        self._pending: dict = {}
+        self._scheduled: set = set()
+        self._ready: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._depth = 0
+        self._in_flight = 0
+        self.max_depth_seen = 0
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        for key in self._scheduled:
+            self._ready.put_nowait(key)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"[{self.name}] {self.workers} workers started")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        if not self._tasks:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while (self._depth or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._depth or self._in_flight:
+            logger.warning(f"[{self.name}] stopping with {self._depth} queued and {self._in_flight} in-flight items")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key, item) -> bool:
+        """Enqueue an item; returns False when the queue or the key's backlog is full."""
+        backlog = self._pending.get(key)
+        if self._depth >= self.max_pending or (backlog is not None and len(backlog) >= self.max_per_key):
+            self.rejected += 1
+            return False
+        if backlog is None:
+            backlog = self._pending[key] = deque()
+        backlog.append((time.monotonic(), item))
+        self._depth += 1
+        self.submitted += 1
+        self.max_depth_seen = max(self.max_depth_seen, self._depth)
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            if self._ready is not None:
+                self._ready.put_nowait(key)
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            key = await self._ready.get()
+            backlog = self._pending[key]
+            enqueued_at, item = backlog.popleft()
+            self._depth -= 1
+            self._in_flight += 1
+            wait_ms = (time.monotonic() - enqueued_at) * 1000
+            self._wait_ms_total += wait_ms
+            self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+            try:
+                await self.handler(item)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"[{self.name}] worker {index} failed on {key}: {e}")
+            finally:
+                self._in_flight -= 1
+                # Re-queue the key behind other keys so one busy chat can't starve the rest
+                if backlog:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                    self._scheduled.discard(key)
+
+    def stats(self) -> dict:
+        started = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "depth": self._depth,
+            "max_depth_seen": self.max_depth_seen,
+            "max_pending": self.max_pending,
+            "max_per_key": self.max_per_key,
+            "active_keys": len(self._scheduled),
+            "in_flight": self._in_flight,
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(self._wait_ms_total / started, 1) if started else 0.0,
+            "wait_ms_max": round(self._wait_ms_max, 1),
+        }
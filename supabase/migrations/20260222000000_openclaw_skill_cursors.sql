@@ -0,0 +1,17 @@
+-- OpenClaw runtime — per-agent skill cursors (watermarks for incremental heartbeat skills)
+
+CREATE TABLE IF NOT EXISTS public.gyeol_skill_cursors (
+  agent_id UUID NOT NULL REFERENCES public.gyeol_agents(id) ON DELETE CASCADE,
+  skill TEXT NOT NULL,
+  cursor TEXT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (agent_id, skill)
+);
+
+ALTER TABLE public.gyeol_skill_cursors ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "service_all_skill_cursors" ON public.gyeol_skill_cursors FOR ALL
+  USING (auth.role() = 'service_role');
+
+-- user-memory 스킬이 커서 이후 사용자 메시지만 읽을 수 있도록
+CREATE INDEX IF NOT EXISTS idx_conversations_agent_role_created
+  ON public.gyeol_conversations(agent_id, role, created_at);
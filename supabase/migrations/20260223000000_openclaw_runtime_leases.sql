@@ -0,0 +1,61 @@
+-- OpenClaw runtime — leases for leader election (only the holder runs the background heartbeat)
+
+CREATE TABLE IF NOT EXISTS public.gyeol_runtime_leases (
+  name TEXT PRIMARY KEY,
+  holder TEXT NOT NULL,
+  acquired_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  expires_at TIMESTAMPTZ NOT NULL,
+  state JSONB NOT NULL DEFAULT '{}'::jsonb,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.gyeol_runtime_leases ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "service_all_runtime_leases" ON public.gyeol_runtime_leases FOR ALL
+  USING (auth.role() = 'service_role');
+
+-- Take or renew a lease atomically, judged by the database clock.
+-- The caller holds it if the returned row's holder is p_holder; otherwise the row describes the current leader.
+CREATE OR REPLACE FUNCTION openclaw_acquire_lease(
+  p_name TEXT,
+  p_holder TEXT,
+  p_ttl_seconds INT,
+  p_state JSONB DEFAULT NULL
+)
+RETURNS SETOF gyeol_runtime_leases
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO gyeol_runtime_leases AS l (name, holder, acquired_at, expires_at, state, updated_at)
+  VALUES (p_name, p_holder, NOW(), NOW() + make_interval(secs => p_ttl_seconds), COALESCE(p_state, '{}'::jsonb), NOW())
+  ON CONFLICT (name) DO UPDATE SET
+    holder = EXCLUDED.holder,
+    acquired_at = CASE WHEN l.holder = EXCLUDED.holder THEN l.acquired_at ELSE NOW() END,
+    expires_at = EXCLUDED.expires_at,
+    state = CASE WHEN l.holder = EXCLUDED.holder THEN COALESCE(p_state, l.state) ELSE EXCLUDED.state END,
+    updated_at = NOW()
+  WHERE l.holder = EXCLUDED.holder OR l.expires_at < NOW();
+
+  RETURN QUERY SELECT * FROM gyeol_runtime_leases WHERE name = p_name;
+END;
+$$;
+
+-- Give a lease up on shutdown so another process can take over without waiting for the TTL
+CREATE OR REPLACE FUNCTION openclaw_release_lease(p_name TEXT, p_holder TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  UPDATE gyeol_runtime_leases SET expires_at = NOW(), updated_at = NOW()
+  WHERE name = p_name AND holder = p_holder;
+END;
+$$;
+
+-- Only the gateway (service role) may take or release leases; holder ids are public in /openclaw/status
+REVOKE EXECUTE ON FUNCTION openclaw_acquire_lease(TEXT, TEXT, INT, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION openclaw_release_lease(TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION openclaw_acquire_lease(TEXT, TEXT, INT, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION openclaw_release_lease(TEXT, TEXT) TO service_role;